@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import PIL
+from PIL import Image
+
+from benchmarks.synth import make_dataset
+from sprite_engine import Reporter, StageStats, create_sprites, extract_frames, resize_frames
+
+STAGES = ('extract', 'resize', 'pack')
+
+
+class CountingReporter(Reporter):
+    def __init__(self):
+        self.done = 0
+        self.stats = StageStats()
+
+    def advance(self, value=1):
+        self.done += value
+
+    def stages(self, stats):
+        self.stats.merge(stats)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def tree_stats(path, extensions=('.png',)):
+    files = 0
+    size = 0
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            if name.endswith(extensions):
+                files += 1
+                size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def fill_ratio(path):
+    # Unique SubTexture area over total sheet area across every packed page
+    used = 0
+    total = 0
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            if not name.endswith('.xml'):
+                continue
+            png_path = os.path.join(root, os.path.splitext(name)[0] + '.png')
+            if not os.path.exists(png_path):
+                continue
+            with Image.open(png_path) as sheet:
+                total += sheet.width * sheet.height
+            regions = {
+                (e.get('x'), e.get('y'), int(e.get('width')), int(e.get('height')))
+                for e in ET.parse(os.path.join(root, name)).getroot().iter('SubTexture')
+            }
+            used += sum(width * height for _, _, width, height in regions)
+    return used / total if total else None
+
+
+def run_stage(stage, input_path, output_path, backend, jobs):
+    # Runs inside a fresh interpreter so peak RSS belongs to this stage only
+    reporter = CountingReporter()
+    start = time.perf_counter()
+    if stage == 'extract':
+        extract_frames(input_path, output_path, jobs=jobs, reporter=reporter, backend=backend, cache=False)
+    elif stage == 'resize':
+        resize_frames(input_path, output_path, jobs=jobs, reporter=reporter, backend=backend, cache=False)
+    else:
+        create_sprites(input_path, output_path, jobs=jobs, reporter=reporter, backend=backend, cache=False)
+    return {
+        'seconds': time.perf_counter() - start,
+        'items': reporter.done,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': reporter.stats.as_dict(),
+    }
+
+
+def measure(stage, input_path, output_path, backend, jobs):
+    shutil.rmtree(output_path, ignore_errors=True)
+    command = [
+        sys.executable, '-m', 'benchmarks.run', '--stage', stage,
+        '--input', input_path, '--output', output_path, '--backend', backend,
+    ]
+    if jobs:
+        command += ['--jobs', str(jobs)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(command, cwd=root, check=True, capture_output=True, text=True)
+    result = json.loads(completed.stdout)
+
+    frames, input_bytes = tree_stats(input_path)
+    if stage == 'extract':
+        frames, _ = tree_stats(output_path)
+    seconds = result['seconds']
+    entry = {
+        'stage': stage,
+        'frames': frames,
+        'seconds': round(seconds, 4),
+        'frames_per_sec': round(frames / seconds, 2) if seconds else None,
+        'mb_per_sec': round(input_bytes / (1024 * 1024) / seconds, 2) if seconds else None,
+        'input_mb': round(input_bytes / (1024 * 1024), 2),
+        'peak_rss_mb': round(result['peak_rss_mb'], 1) if result['peak_rss_mb'] else None,
+        'stages': result['stages'],
+    }
+    if stage == 'pack':
+        ratio = fill_ratio(output_path)
+        entry['fill_ratio'] = round(ratio, 4) if ratio is not None else None
+    return entry
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark the extract, resize and pack stages.')
+    parser.add_argument('--workdir', help='Folder for the synthetic dataset and outputs (default: temp dir)')
+    parser.add_argument('--sizes', default='2048,4096,8192', help='Comma-separated source sheet sizes')
+    parser.add_argument('--animations', type=int, default=4, help='Number of animation folders to pack')
+    parser.add_argument('--frames', type=int, default=48, help='Frames per animation folder')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma-separated stages to run')
+    parser.add_argument('--backend', default='threads', choices=('threads', 'processes', 'serial'))
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--regenerate', action='store_true', help='Rebuild the dataset even if it exists')
+    parser.add_argument('-o', '--out', help='Write the JSON report here instead of stdout')
+    # Internal: run a single stage and print its raw timings
+    parser.add_argument('--stage', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, args.input, args.output, args.backend, args.jobs)))
+        return 0
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='sprite-bench-')
+    dataset = os.path.join(workdir, 'dataset')
+    sizes = tuple(int(size) for size in args.sizes.split(','))
+    if args.regenerate or not os.path.isdir(dataset):
+        shutil.rmtree(dataset, ignore_errors=True)
+        start = time.perf_counter()
+        make_dataset(dataset, sizes, args.animations, args.frames, args.seed)
+        print(f"Generated dataset in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    outputs = os.path.join(workdir, 'outputs')
+    inputs = {
+        'extract': (os.path.join(dataset, 'atlases'), os.path.join(outputs, 'extracted')),
+        'resize': (os.path.join(outputs, 'extracted'), os.path.join(outputs, 'resized')),
+        'pack': (os.path.join(dataset, 'animations'), os.path.join(outputs, 'packed')),
+    }
+
+    results = []
+    for stage in args.stages.split(','):
+        input_path, output_path = inputs[stage]
+        if stage == 'resize' and not os.path.isdir(input_path):
+            results.append(measure('extract', *inputs['extract'], args.backend, args.jobs))
+        entry = measure(stage, input_path, output_path, args.backend, args.jobs)
+        results.append(entry)
+        print(f"{stage}: {entry['frames']} frames in {entry['seconds']}s", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'backend': args.backend,
+            'jobs': args.jobs,
+            'seed': args.seed,
+            'sheet_sizes': list(sizes),
+            'animations': args.animations,
+            'frames_per_animation': args.frames,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import os
+import random
+
+from PIL import Image, ImageDraw
+
+from sprite_engine.packer import pack_pages
+
+COLORS = [
+    (231, 76, 60, 255), (46, 204, 113, 255), (52, 152, 219, 255),
+    (241, 196, 15, 255), (155, 89, 182, 255), (236, 240, 241, 255),
+]
+
+
+def make_frame(rng, width, height):
+    frame = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(frame)
+    for _ in range(rng.randint(2, 6)):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = rng.randint(x0, width), rng.randint(y0, height)
+        shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+        shape((x0, y0, x1, y1), fill=rng.choice(COLORS))
+    return frame
+
+
+def make_atlas(folder, name, sheet_size, seed=0, rotated_ratio=0.25, trimmed_ratio=0.5):
+    # Writes name.png/name.xml: a Sparrow/Starling TextureAtlas about 70% full,
+    # with some frames stored rotated and some trimmed out of a larger canvas
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    max_side = max(16, sheet_size // 8)
+
+    frames = []
+    area = 0
+    while area < sheet_size * sheet_size * 0.7:
+        width, height = rng.randint(16, max_side), rng.randint(16, max_side)
+        rotated = rng.random() < rotated_ratio
+        # Region size in the sheet; rotated frames are stored transposed
+        region = (height, width) if rotated else (width, height)
+        frames.append((f"{name}_{len(frames):04d}", width, height, rotated, region))
+        area += width * height
+
+    pages = pack_pages(
+        [(key, region[0], region[1]) for key, _, _, _, region in frames],
+        padding=2, max_size=sheet_size,
+    )
+    placements = pages[0].placements
+
+    sheet = Image.new("RGBA", (sheet_size, sheet_size), (0, 0, 0, 0))
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', f'<TextureAtlas imagePath="{name}.png">']
+    for key, width, height, rotated, region in frames:
+        placement = placements.get(key)
+        if placement is None:
+            continue
+        frame = make_frame(rng, width, height)
+        sheet.paste(frame.transpose(Image.ROTATE_270) if rotated else frame, (placement.x, placement.y))
+
+        attributes = f'name="{key}" x="{placement.x}" y="{placement.y}" width="{region[0]}" height="{region[1]}"'
+        if rng.random() < trimmed_ratio:
+            pad_x, pad_y = rng.randint(1, 24), rng.randint(1, 24)
+            attributes += (
+                f' frameX="{-pad_x}" frameY="{-pad_y}"'
+                f' frameWidth="{width + 2 * pad_x}" frameHeight="{height + 2 * pad_y}"'
+            )
+        if rotated:
+            attributes += ' rotated="true"'
+        lines.append(f'    <SubTexture {attributes}/>')
+    lines.append('</TextureAtlas>')
+
+    sheet.save(os.path.join(folder, f"{name}.png"))
+    with open(os.path.join(folder, f"{name}.xml"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return len(placements)
+
+
+def make_animation(folder, frame_count, size=(256, 256), unique_ratio=0.6, seed=0):
+    # Writes frame_count PNGs where only about unique_ratio of them are distinct;
+    # the rest are held frames, some shifted inside extra transparent padding
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    unique = []
+    for index in range(frame_count):
+        if unique and rng.random() > unique_ratio:
+            frame = rng.choice(unique)
+            if rng.random() < 0.3:
+                padded = Image.new("RGBA", (size[0] + 16, size[1] + 16), (0, 0, 0, 0))
+                padded.paste(frame, (rng.randint(0, 16), rng.randint(0, 16)))
+                frame = padded
+        else:
+            frame = Image.new("RGBA", size, (0, 0, 0, 0))
+            inner = make_frame(rng, size[0] * 3 // 4, size[1] * 3 // 4)
+            frame.paste(inner, (rng.randint(0, size[0] // 4), rng.randint(0, size[1] // 4)))
+            unique.append(frame)
+        frame.save(os.path.join(folder, f"frame{index:04d}.png"))
+    return frame_count
+
+
+def make_dataset(root, sheet_sizes=(2048, 4096, 8192), animations=4, animation_frames=48, seed=0):
+    atlases = os.path.join(root, "atlases")
+    frames = os.path.join(root, "animations")
+    counts = {"atlas_frames": 0, "animation_frames": 0}
+    for index, sheet_size in enumerate(sheet_sizes):
+        counts["atlas_frames"] += make_atlas(
+            os.path.join(atlases, f"sheet{sheet_size}"), f"sheet{sheet_size}", sheet_size, seed=seed + index
+        )
+    for index in range(animations):
+        counts["animation_frames"] += make_animation(
+            os.path.join(frames, f"anim{index}"), animation_frames, seed=seed + 100 + index
+        )
+    return counts
@@ -4,6 +4,7 @@ package.name = spriteprocessor
 package.domain = org.noctrox
 source.dir = .
 source.include_exts = py,png,jpg,kv,atlas
+source.exclude_dirs = benchmarks, tests
 version = 1.0
 requirements = python3,kivy,pillow
 orientation = portrait
@@ -0,0 +1,38 @@
+from .atlas import Atlas, Frame, read_atlas, write_atlas
+from .formats import FORMATS, get_format, sniff_format
+from .extract import extract_frames, process_sprite_sheet
+from .jobs import FINISHED_STATES, Job, JobCancelled, JobReporter, JobScheduler
+from .pack import PackOptions, create_sprites, pack_folder
+from .pipeline import convert_sheets
+from .report import ConsoleSink, EventReporter, JsonLinesSink, Reporter, StageStats
+from .resize import resize_frames, resize_image, calculate_factor, get_dimensions_from_txt
+
+__all__ = [
+    'Reporter',
+    'EventReporter',
+    'StageStats',
+    'ConsoleSink',
+    'JsonLinesSink',
+    'extract_frames',
+    'process_sprite_sheet',
+    'resize_frames',
+    'resize_image',
+    'calculate_factor',
+    'get_dimensions_from_txt',
+    'Atlas',
+    'Frame',
+    'read_atlas',
+    'write_atlas',
+    'FORMATS',
+    'get_format',
+    'sniff_format',
+    'create_sprites',
+    'pack_folder',
+    'PackOptions',
+    'convert_sheets',
+    'Job',
+    'JobCancelled',
+    'JobReporter',
+    'JobScheduler',
+    'FINISHED_STATES',
+]
@@ -0,0 +1,101 @@
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+from .encode import write_bytes
+
+SIGNATURE = "<!-- CREATED BY NOCTROX GATO -->"
+HEADER = f"<?xml version='1.0' encoding='utf-8'?>\n{SIGNATURE}\n"
+INDENT = "    "
+ATTRIBUTE_ESCAPES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+
+# One SubTexture. x/y/width/height is the region in the sheet; frame_* place
+# it inside the untrimmed frame (frame_x/frame_y are zero or negative)
+Frame = namedtuple('Frame', [
+    'name', 'x', 'y', 'width', 'height',
+    'frame_x', 'frame_y', 'frame_width', 'frame_height', 'rotated',
+])
+
+
+class Atlas:
+    # One sheet image and its frames; size is the sheet's (width, height) when known
+    __slots__ = ('image_path', 'frames', 'size')
+
+    def __init__(self, image_path, frames, size=None):
+        self.image_path = image_path
+        self.frames = frames
+        self.size = size
+
+
+def to_int(value):
+    # Most atlases store plain integers; only fall back to float for "12.0"
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+def frame_from_attributes(attrib):
+    width = to_int(attrib.get('width', 0))
+    height = to_int(attrib.get('height', 0))
+    frame_width = attrib.get('frameWidth')
+    frame_height = attrib.get('frameHeight')
+    return Frame(
+        attrib['name'],
+        to_int(attrib.get('x', 0)),
+        to_int(attrib.get('y', 0)),
+        width,
+        height,
+        to_int(attrib.get('frameX', 0)),
+        to_int(attrib.get('frameY', 0)),
+        width if frame_width is None else to_int(frame_width),
+        height if frame_height is None else to_int(frame_height),
+        attrib.get('rotated', 'false').lower() == 'true',
+    )
+
+
+def read_atlas(path):
+    # Single streaming pass; each SubTexture is turned into a Frame and
+    # dropped as soon as it is read, so the tree never builds up
+    image_path = None
+    frames = []
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'TextureAtlas':
+                image_path = elem.get('imagePath')
+            continue
+        if elem.tag == 'SubTexture':
+            frames.append(frame_from_attributes(elem.attrib))
+            elem.clear()
+    return Atlas(image_path, frames)
+
+
+def quote(value):
+    return '"' + escape(str(value), ATTRIBUTE_ESCAPES) + '"'
+
+
+def iter_atlas(atlas):
+    # Yields the document piece by piece, SubTextures sorted by name
+    yield HEADER
+    yield f"<TextureAtlas imagePath={quote(atlas.image_path)}>\n"
+    for frame in sorted(atlas.frames, key=lambda frame: frame.name):
+        line = (
+            f"{INDENT}<SubTexture name={quote(frame.name)} x=\"{frame.x}\" y=\"{frame.y}\" "
+            f"width=\"{frame.width}\" height=\"{frame.height}\" "
+            f"frameWidth=\"{frame.frame_width}\" frameHeight=\"{frame.frame_height}\" "
+            f"frameX=\"{frame.frame_x}\" frameY=\"{frame.frame_y}\""
+        )
+        if frame.rotated:
+            line += ' rotated="true"'
+        yield line + "/>\n"
+    yield "</TextureAtlas>"
+
+
+def serialize_atlas(atlas):
+    return "".join(iter_atlas(atlas)).encode('utf-8')
+
+
+def write_atlas(atlas, path, stats=None):
+    data = serialize_atlas(atlas)
+    write_bytes(data, path, stats)
+    return len(data)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.sprite_manifest.json'
+CACHE_VERSION = 2
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def options_digest(stage, options=None):
+    values = vars(options) if options is not None and hasattr(options, '__dict__') else options
+    payload = json.dumps([CACHE_VERSION, stage, values], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class BuildManifest:
+    # Persistent record of which inputs and options produced which outputs.
+    # Content digests are cached by (size, mtime) so unchanged files are not
+    # re-read on every run.
+
+    def __init__(self, output_path):
+        self.base_path = output_path
+        self.path = os.path.join(output_path, MANIFEST_NAME)
+        self.entries = {}
+        self.files = {}
+        self.dirty = False
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == CACHE_VERSION:
+            self.entries = data.get('entries', {})
+            self.files = data.get('files', {})
+
+    def digest(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        cached = self.files.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        value = file_digest(path)
+        self.files[key] = [stat.st_size, stat.st_mtime_ns, value]
+        self.dirty = True
+        return value
+
+    def inputs_digest(self, paths, base_path):
+        digest = hashlib.blake2b(digest_size=16)
+        for path in sorted(paths):
+            digest.update(os.path.relpath(path, base_path).encode('utf-8'))
+            digest.update(self.digest(path).encode('ascii'))
+        return digest.hexdigest()
+
+    def is_fresh(self, key, inputs, options):
+        entry = self.entries.get(key)
+        if not entry or entry['inputs'] != inputs or entry['options'] != options:
+            return False
+        return all(os.path.exists(os.path.join(self.base_path, path)) for path in entry['outputs'])
+
+    def record(self, key, inputs, options, outputs):
+        outputs = sorted(os.path.relpath(path, self.base_path) for path in outputs)
+        self.entries[key] = {'inputs': inputs, 'options': options, 'outputs': outputs}
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': self.entries, 'files': self.files}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+class NullManifest:
+    # Stand-in used when caching is disabled; every unit is rebuilt
+
+    def inputs_digest(self, paths, base_path):
+        return None
+
+    def is_fresh(self, key, inputs, options):
+        return False
+
+    def record(self, key, inputs, options, outputs):
+        pass
+
+    def save(self):
+        pass
+
+
+def open_manifest(output_path, cache=True):
+    return BuildManifest(output_path) if cache else NullManifest()
@@ -0,0 +1,182 @@
+import argparse
+import sys
+
+from .encode import ENCODE_PROFILES
+from .executor import BACKENDS
+from .extract import extract_frames
+from .formats import FORMATS
+from .pack import PackOptions, create_sprites
+from .packer import ALGORITHMS, SORT_KEYS
+from .pipeline import convert_sheets
+from .rawcache import RAW_DIR_NAME
+from .report import ConsoleSink, EventReporter, JsonLinesSink
+from .resize import QUALITY_GAPS, resize_frames
+
+
+# Frames are read back by resize and pack, which only pick up PNG
+FRAME_PROFILES = sorted(name for name, profile in ENCODE_PROFILES.items() if profile.extension == '.png')
+
+
+def add_common_arguments(sub):
+    sub.add_argument('input', help='Input folder')
+    sub.add_argument('output', help='Output folder')
+    sub.add_argument('-j', '--jobs', type=int, default=None,
+                     help='Number of parallel workers (default: CPU count)')
+    sub.add_argument('--backend', choices=BACKENDS, default='processes',
+                     help='Run CPU-bound work on threads, processes or serially (default: processes)')
+    sub.add_argument('--no-cache', dest='cache', action='store_false',
+                     help='Rebuild everything instead of skipping unchanged inputs')
+    sub.add_argument('-q', '--quiet', action='store_true', help='Suppress status messages')
+    sub.add_argument('--events', metavar='PATH', default=None,
+                     help='Write progress, status and per-stage timing events as JSON lines '
+                          '(- for stdout)')
+
+
+def add_encode_argument(sub, choices):
+    sub.add_argument('--encode', choices=choices, default='balanced',
+                     help='fast: zlib level 1 for intermediate files, balanced: Pillow defaults, '
+                          'small: optimize and use a palette when it is lossless, '
+                          'webp: lossless WebP sheets (default: balanced)')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='sprite_engine',
+        description='Extract, resize and pack sprite sheets without the UI.',
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    extract = subparsers.add_parser('extract', help='Cut PNG/XML sprite sheets into frame folders')
+    add_common_arguments(extract)
+    add_encode_argument(extract, FRAME_PROFILES)
+    add_memory_argument(extract)
+    extract.add_argument('--large-sheet-side', type=int, default=None,
+                         help='Sheets with at least this many pixels squared are decoded once into a '
+                              'memory-mapped raw file shared by the workers; 0 disables (default: 4096 '
+                              'with --backend processes, off otherwise)')
+    extract.add_argument('--raw-cache', default=None,
+                         help=f'Folder for the raw sheet files (default: {RAW_DIR_NAME} in the output folder)')
+
+    resize = subparsers.add_parser('resize', help='Downscale frame folders using their WxH.txt marker')
+    add_common_arguments(resize)
+    add_encode_argument(resize, FRAME_PROFILES)
+    resize.add_argument('--remove-originals', action='store_true',
+                        help='Delete each source PNG once its resized copy is written')
+    add_quality_argument(resize)
+
+    pack = subparsers.add_parser('pack', help='Pack frame folders into sprite sheets')
+    add_pack_arguments(pack)
+
+    convert = subparsers.add_parser(
+        'convert', help='Extract, resize and repack sprite sheets in one pass without writing frames')
+    add_pack_arguments(convert)
+    add_quality_argument(convert)
+    add_memory_argument(convert)
+    convert.add_argument('--no-resize', dest='resize', action='store_false',
+                         help='Keep frames at their original size')
+
+    return parser
+
+
+def add_memory_argument(sub):
+    sub.add_argument('--memory-budget', type=int, default=None, metavar='MB',
+                     help='Limit work in flight by the decoded image memory it holds, in MB '
+                          '(default: unlimited)')
+
+
+def megabytes(value):
+    return value * 1024 * 1024 if value else None
+
+
+def square(side):
+    return side * side if side is not None else None
+
+
+def add_quality_argument(sub):
+    sub.add_argument('--quality', choices=sorted(QUALITY_GAPS), default='balanced',
+                     help='fast: box reduce as far as possible, then LANCZOS for the rest; '
+                          'balanced: reduce to about twice the target, then LANCZOS; '
+                          'exact: full-resolution LANCZOS (default: balanced)')
+
+
+def add_pack_arguments(pack):
+    add_common_arguments(pack)
+    add_encode_argument(pack, sorted(ENCODE_PROFILES))
+    pack.add_argument('--algorithm', choices=sorted(ALGORITHMS), default='maxrects',
+                      help='Bin-packing algorithm (default: maxrects)')
+    pack.add_argument('--sort', choices=sorted(SORT_KEYS) + ['none'], default='area',
+                      help='Order frames are placed in (default: area)')
+    pack.add_argument('--padding', type=int, default=2,
+                      help='Pixels between frames (default: 2)')
+    pack.add_argument('--max-size', type=int, default=None,
+                      help='Maximum sheet width and height; frames that do not fit '
+                           'spill onto name-0.png, name-1.png, ...')
+    pack.add_argument('--alpha-threshold', type=int, default=0,
+                      help='Treat pixels with alpha at or below this value as empty when trimming')
+    pack.add_argument('--margin', type=int, default=0,
+                      help='Transparent pixels kept around each trimmed frame')
+    pack.add_argument('--extrude', type=int, default=0,
+                      help='Repeat frame edge pixels this many times around each region')
+    pack.add_argument('--pot', action='store_true', help='Round sheet sizes up to powers of two')
+    pack.add_argument('--rotate', action='store_true',
+                      help='Let frames be stored rotated 90 degrees when that packs tighter '
+                           '(written as rotated="true"; not available with --format spine)')
+    pack.add_argument('--format', dest='formats', action='append', choices=sorted(FORMATS),
+                      help='Atlas format to write; repeat to write several (default: sparrow)')
+
+
+def run(args, reporter):
+    if args.command == 'extract':
+        return extract_frames(args.input, args.output, jobs=args.jobs, reporter=reporter,
+                              backend=args.backend, cache=args.cache, encode=args.encode,
+                              memory_budget=megabytes(args.memory_budget),
+                              large_sheet_pixels=square(args.large_sheet_side), raw_cache_dir=args.raw_cache)
+    if args.command == 'resize':
+        return resize_frames(args.input, args.output, jobs=args.jobs, reporter=reporter,
+                             backend=args.backend, cache=args.cache,
+                             keep_originals=not args.remove_originals, quality=args.quality,
+                             encode=args.encode)
+    options = pack_options(args)
+    if args.command == 'convert':
+        return convert_sheets(args.input, args.output, jobs=args.jobs, reporter=reporter, options=options,
+                              backend=args.backend, cache=args.cache, quality=args.quality,
+                              resize=args.resize, memory_budget=megabytes(args.memory_budget))
+    return create_sprites(args.input, args.output, jobs=args.jobs, reporter=reporter,
+                          options=options, backend=args.backend, cache=args.cache)
+
+
+def pack_options(args):
+    return PackOptions(
+        algorithm=args.algorithm,
+        sort=args.sort,
+        padding=args.padding,
+        max_size=args.max_size,
+        power_of_two=args.pot,
+        alpha_threshold=args.alpha_threshold,
+        margin=args.margin,
+        extrude=args.extrude,
+        formats=args.formats or ('sparrow',),
+        encode=args.encode,
+        allow_rotation=args.rotate,
+    )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sinks = [ConsoleSink(quiet=args.quiet)]
+    events = None
+    if args.events == '-':
+        sinks.append(JsonLinesSink(sys.stdout))
+    elif args.events:
+        events = open(args.events, 'w')
+        sinks.append(JsonLinesSink(events))
+    reporter = EventReporter(sinks, job=args.command)
+    try:
+        run(args, reporter)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if events is not None:
+            events.close()
+    return 0
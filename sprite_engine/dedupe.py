@@ -0,0 +1,48 @@
+import hashlib
+
+SAMPLE_GRID = 3
+
+
+def pixel_sample(image):
+    # A few pixels on a fixed grid; frames that differ here can't be duplicates
+    width, height = image.size
+    xs = {width * (i + 1) // (SAMPLE_GRID + 1) for i in range(SAMPLE_GRID)}
+    ys = {height * (i + 1) // (SAMPLE_GRID + 1) for i in range(SAMPLE_GRID)}
+    return tuple(image.getpixel((x, y)) for y in sorted(ys) for x in sorted(xs))
+
+
+def image_digest(image):
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update(image.tobytes())
+    if image.mode == 'P':
+        digest.update(image.palette.tobytes())
+    return digest.digest()
+
+
+class DedupeIndex:
+    # Finds identical frames keyed on (size, mode, strong digest). Frames are
+    # first bucketed by size, mode and a pixel sample, and the digest is only
+    # computed once a bucket holds more than one frame, so unique frames are
+    # never hashed. Passing `reload` keeps only a way to get the frame back
+    # instead of the frame itself.
+
+    def __init__(self):
+        self.buckets = {}
+
+    def find_or_add(self, key, image, reload=None):
+        # Returns the key of an identical frame already indexed, or None after
+        # indexing this one
+        bucket = self.buckets.setdefault((image.size, image.mode, pixel_sample(image)), [])
+        if not bucket:
+            bucket.append([key, None, reload or (lambda: image)])
+            return None
+
+        digest = image_digest(image)
+        for entry in bucket:
+            if entry[1] is None:
+                entry[1] = image_digest(entry[2]())
+                entry[2] = None
+            if entry[1] == digest:
+                return entry[0]
+        bucket.append([key, digest, None])
+        return None
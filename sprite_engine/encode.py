@@ -0,0 +1,98 @@
+import io
+import os
+import time
+
+from PIL import Image, ImageChops
+
+
+class EncodeProfile:
+    __slots__ = ('name', 'format', 'extension', 'params', 'quantize')
+
+    def __init__(self, name, format, extension, params=None, quantize=False):
+        self.name = name
+        self.format = format
+        self.extension = extension
+        self.params = params or {}
+        self.quantize = quantize
+
+
+# fast is meant for intermediate frames that get repacked right away, small
+# for final sheets, webp for engines that load it. balanced is Pillow's default.
+ENCODE_PROFILES = {
+    profile.name: profile
+    for profile in (
+        EncodeProfile('fast', 'PNG', '.png', {'compress_level': 1}),
+        EncodeProfile('balanced', 'PNG', '.png'),
+        EncodeProfile('small', 'PNG', '.png', {'optimize': True}, quantize=True),
+        EncodeProfile('webp', 'WEBP', '.webp', {'lossless': True, 'exact': True}),
+    )
+}
+SHEET_EXTENSIONS = tuple(sorted({profile.extension for profile in ENCODE_PROFILES.values()}))
+
+
+def get_profile(name):
+    if isinstance(name, EncodeProfile):
+        return name
+    try:
+        return ENCODE_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown encode profile: {name}") from None
+
+
+def frame_profile(name):
+    # Frames are picked up again by resize and pack, which only read PNG
+    profile = get_profile(name)
+    if profile.extension != '.png':
+        raise ValueError(f"Frames are written as PNG; the {profile.name} profile is only for sheets")
+    return profile
+
+
+def palette_image(image):
+    # Lossless only: an RGBA image with at most 256 colours becomes a palette
+    # image when the round trip is exact, anything else is returned as is
+    if image.mode != 'RGBA' or image.getcolors(256) is None:
+        return image
+    quantized = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+    if ImageChops.difference(quantized.convert('RGBA'), image).getbbox() is not None:
+        return image
+    return quantized
+
+
+def encode_image(image, stats=None, profile='balanced'):
+    profile = get_profile(profile)
+    if profile.quantize:
+        start = time.perf_counter()
+        image = palette_image(image)
+        if stats is not None:
+            stats.add('quantize', time.perf_counter() - start, 1)
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    image.save(buffer, profile.format, **profile.params)
+    data = buffer.getvalue()
+    if stats is not None:
+        stats.add('encode', time.perf_counter() - start, 1, len(data))
+    return data
+
+
+def write_bytes(data, path, stats=None, atomic=False):
+    # With atomic=True the file is written next to the target and renamed into
+    # place, so a crash never leaves a truncated file behind
+    start = time.perf_counter()
+    target = path + '.part' if atomic else path
+    try:
+        with open(target, 'wb') as f:
+            f.write(data)
+        if atomic:
+            os.replace(target, path)
+    except BaseException:
+        if atomic and os.path.exists(target):
+            os.remove(target)
+        raise
+    if stats is not None:
+        stats.add('write', time.perf_counter() - start, 1, len(data))
+
+
+def write_image(image, path, stats=None, atomic=False, profile='balanced'):
+    data = encode_image(image, stats, profile)
+    write_bytes(data, path, stats, atomic)
+    return len(data)
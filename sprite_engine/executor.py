@@ -0,0 +1,108 @@
+import os
+from concurrent.futures import (
+    ALL_COMPLETED, FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+
+BACKENDS = ('threads', 'processes', 'serial')
+
+
+class SerialExecutor(Executor):
+    # Runs every task inline; handy for debugging and for platforms without
+    # working multiprocessing (Android)
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def default_workers(backend, jobs=None):
+    if jobs:
+        return jobs
+    if backend == 'threads':
+        return min(32, (os.cpu_count() or 1) + 4)
+    if backend == 'processes':
+        return os.cpu_count() or 1
+    return 1
+
+
+def make_executor(backend='threads', jobs=None):
+    workers = default_workers(backend, jobs)
+    if backend == 'threads':
+        return ThreadPoolExecutor(max_workers=workers)
+    if backend == 'processes':
+        return ProcessPoolExecutor(max_workers=workers)
+    if backend == 'serial':
+        return SerialExecutor()
+    raise ValueError(f"Unknown executor backend: {backend}")
+
+
+def chunk_size(count, workers, backend='threads', max_chunk=64):
+    # Processes pay IPC per task, so small items are batched into a few
+    # chunks per worker; threads and serial runs take one item at a time
+    if backend != 'processes':
+        return 1
+    return max(1, min(max_chunk, count // (workers * 4)))
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class TaskQueue:
+    # Submits tasks with at most `window` in flight and hands each result to
+    # on_result on the submitting thread, so results arrive in one place and
+    # memory for queued work stays bounded. With a byte `budget`, each task
+    # also declares the memory it will hold (`cost`) and submission waits
+    # until the tasks in flight leave room for it; one task always runs.
+
+    def __init__(self, executor, window, on_result=None, budget=None):
+        self.executor = executor
+        self.window = max(1, window)
+        self.on_result = on_result
+        self.budget = budget
+        self.pending = set()
+        self.costs = {}
+        self.in_flight = 0
+
+    def submit(self, fn, *args, cost=0):
+        while self.pending and (len(self.pending) >= self.window or not self.fits(cost)):
+            self._collect(FIRST_COMPLETED)
+        future = self.executor.submit(fn, *args)
+        self.pending.add(future)
+        self.costs[future] = cost
+        self.in_flight += cost
+
+    def fits(self, cost):
+        return not self.budget or self.in_flight + cost <= self.budget
+
+    def reserve(self, nbytes):
+        # Waits until nbytes more would fit, for memory the caller holds itself
+        while self.pending and not self.fits(nbytes):
+            self._collect(FIRST_COMPLETED)
+
+    def drain(self):
+        while self.pending:
+            self._collect(ALL_COMPLETED)
+
+    def _collect(self, return_when):
+        done, self.pending = wait(self.pending, return_when=return_when)
+        for future in done:
+            self.in_flight -= self.costs.pop(future, 0)
+            result = future.result()
+            if self.on_result is not None:
+                self.on_result(result)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.drain()
+        else:
+            for future in self.pending:
+                future.cancel()
@@ -0,0 +1,379 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from PIL import Image
+
+from .cache import open_manifest, options_digest
+from .executor import TaskQueue, chunk_size, chunked, default_workers, make_executor
+from .encode import SHEET_EXTENSIONS, frame_profile, write_image
+from .formats import ATLAS_EXTENSIONS, read_head, sniff_format
+from .rawcache import (
+    LARGE_SHEET_PIXELS, RAW_DIR_NAME, RawSheet, RawSheetCache, open_raw_sheet, rgba_bytes, sheet_size,
+)
+from .report import Reporter, StageStats
+
+SKIP_DIRS = {'frames_output', 'Quegod', 'frames'}
+
+PAGE_PATTERN = re.compile(r'^(.+)-(\d+)$')
+UNSAFE_NAME = re.compile(r'[<>:"/\\|?*]')
+
+
+class SheetTask:
+    __slots__ = (
+        'png_path', 'atlas_path', 'relative_path', 'frames', 'frame_dir_name', 'write_marker', 'clockwise',
+    )
+
+    def __init__(self, png_path, atlas_path, relative_path, frames, frame_dir_name, write_marker=True,
+                 clockwise=True):
+        self.png_path = png_path
+        self.atlas_path = atlas_path
+        self.relative_path = relative_path
+        self.frames = frames
+        self.frame_dir_name = frame_dir_name
+        self.write_marker = write_marker
+        self.clockwise = clockwise
+
+
+def page_groups(pages, stems):
+    # pages maps the stem of each single-page atlas to (signed, frame names).
+    # Pages the packer wrote as name-0, name-1, ... are extracted into one
+    # "name" folder only when they are provably one packed set: page 0 is
+    # there, no atlas is called "name", every page carries the packer's
+    # signature and no frame name repeats across pages. Only page 0 writes
+    # the WxH.txt marker. Returns stem -> (frame_dir_name, write_marker).
+    groups = {stem: (stem, True) for stem in pages}
+    sets = {}
+    for stem in pages:
+        match = PAGE_PATTERN.match(stem)
+        if match:
+            sets.setdefault(match.group(1), {})[int(match.group(2))] = stem
+    for base, members in sets.items():
+        if 0 not in members or base in stems:
+            continue
+        names = set()
+        for stem in members.values():
+            signed, frame_names = pages[stem]
+            if not signed or not names.isdisjoint(frame_names):
+                break
+            names.update(frame_names)
+        else:
+            for index, stem in members.items():
+                groups[stem] = (base, index == 0)
+    return groups
+
+
+def safe_frames(frames):
+    # Frame names become file names, so characters no filesystem accepts are replaced
+    return [
+        frame._replace(name=UNSAFE_NAME.sub('_', frame.name)) if UNSAFE_NAME.search(frame.name) else frame
+        for frame in frames
+    ]
+
+
+def resolve_image(folder, stem, image_path, single_page=True):
+    # Renamed sheets often keep a stale imagePath, so a single-page atlas
+    # prefers the sheet image that shares its file name
+    candidates = []
+    if single_page:
+        candidates.extend(os.path.join(folder, stem + extension) for extension in SHEET_EXTENSIONS)
+    if image_path:
+        candidates.append(os.path.join(folder, image_path))
+        candidates.extend(os.path.join(folder, image_path + extension) for extension in SHEET_EXTENSIONS)
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def find_sheets(input_path, reporter, stats=None):
+    stats = stats or StageStats()
+    tasks = []
+    claimed = set()
+    walk = os.walk(input_path)
+    while True:
+        with stats.time('scan'):
+            entry = next(walk, None)
+        if entry is None:
+            break
+        root, dirs, files = entry
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        relative_path = os.path.relpath(root, input_path)
+
+        # Each candidate is sniffed from one read of its head, then parsed once
+        atlases = []
+        for file in sorted(files):
+            if not file.lower().endswith(ATLAS_EXTENSIONS):
+                continue
+            atlas_path = os.path.join(root, file)
+            reporter.checkpoint()
+            with stats.time('parse'):
+                head = read_head(atlas_path)
+                fmt = sniff_format(atlas_path, head)
+            if fmt is None:
+                continue
+            try:
+                with stats.time('parse', items=1, nbytes=os.path.getsize(atlas_path)):
+                    pages = fmt.read(atlas_path)
+            except (ET.ParseError, KeyError, TypeError, ValueError):
+                reporter.status(f"Error in {atlas_path}, skipping")
+                continue
+            atlases.append((fmt.file_stem(file), atlas_path, pages, fmt.signed(head), fmt.clockwise))
+
+        # Page images are resolved and claimed first, so grouping only looks
+        # at the pages that will actually be extracted. Multipage atlases go
+        # first: their pages are one set by construction, so they claim the
+        # images that per-page atlases written alongside them also point at.
+        atlases.sort(key=lambda atlas: len(atlas[2]) == 1)
+        sheets = []
+        single_pages = {}
+        for stem, atlas_path, pages, signed, clockwise in atlases:
+            for index, page in enumerate(pages):
+                png_path = resolve_image(root, stem, page.image_path, len(pages) == 1)
+                if png_path is None:
+                    continue
+                if png_path in claimed:
+                    reporter.status(f"{png_path} already read from another atlas, skipping {atlas_path}")
+                    continue
+                claimed.add(png_path)
+                frames = safe_frames(page.frames)
+                sheets.append((stem, atlas_path, index, png_path, frames, clockwise))
+                if len(pages) == 1:
+                    single_pages[stem] = (signed, [frame.name for frame in frames])
+
+        groups = page_groups(single_pages, {atlas[0] for atlas in atlases})
+        for stem, atlas_path, index, png_path, frames, clockwise in sheets:
+            frame_dir_name, write_marker = groups.get(stem, (stem, True))
+            tasks.append(SheetTask(
+                png_path, atlas_path, relative_path, frames, frame_dir_name, write_marker and index == 0,
+                clockwise,
+            ))
+    return tasks
+
+
+def extract_frames(input_path, output_path, jobs=None, reporter=None, backend='threads', cache=True,
+                   encode='balanced', memory_budget=None, large_sheet_pixels=None,
+                   raw_cache_dir=None):
+    reporter = reporter or Reporter()
+    frame_profile(encode)
+    stats = StageStats()
+    tasks = find_sheets(input_path, reporter, stats)
+    reporter.stages(stats)
+
+    if not tasks:
+        reporter.status("No valid PNG/XML files found")
+        reporter.finish()
+        return 0
+
+    total_frames = sum(len(task.frames) for task in tasks)
+    reporter.start(total_frames)
+
+    manifest = open_manifest(output_path, cache)
+    pending = {}
+    skipped = 0
+
+    def on_result(result):
+        png_path, saved, errors, worker_stats = result
+        reporter.stages(worker_stats)
+        reporter.advance(saved)
+        for error in errors:
+            reporter.status(error)
+        build = pending[png_path]
+        build['remaining'] -= saved + len(errors)
+        build['failed'] = build['failed'] or bool(errors)
+        if build['remaining'] <= 0 and not build['failed']:
+            manifest.record(build['key'], build['inputs'], build['options'], build['outputs'])
+
+    def is_fresh(task):
+        key = f"extract:{os.path.relpath(task.png_path, input_path)}"
+        inputs = manifest.inputs_digest([task.png_path, task.atlas_path], input_path)
+        # Other atlases in the folder decide how pages are grouped, so where the
+        # frames go is part of what the cached output was built with
+        options = options_digest('extract', {
+            'encode': encode, 'frame_dir': task.frame_dir_name, 'marker': task.write_marker,
+        })
+        if manifest.is_fresh(key, inputs, options):
+            return True
+        frame_output_dir = os.path.join(output_path, task.relative_path, task.frame_dir_name)
+        pending[task.png_path] = {
+            'key': key,
+            'inputs': inputs,
+            'options': options,
+            'outputs': [os.path.join(frame_output_dir, f"{frame.name}.png") for frame in task.frames],
+            'remaining': len(task.frames),
+            'failed': False,
+        }
+        return False
+
+    workers = default_workers(backend, jobs)
+    if large_sheet_pixels is None:
+        # Threads already share one decoded sheet, and the raw file is decoded
+        # from the whole sheet anyway, so it only pays off across processes
+        large_sheet_pixels = LARGE_SHEET_PIXELS if backend == 'processes' else 0
+    # Raw sheets default to a hidden folder in the output, which is on disk
+    raw_cache = RawSheetCache(raw_cache_dir or os.path.join(output_path, RAW_DIR_NAME), large_sheet_pixels)
+    try:
+        with raw_cache, make_executor(backend, jobs) as executor, \
+                TaskQueue(executor, workers * 2, on_result, memory_budget) as queue:
+            for task in tasks:
+                reporter.checkpoint()
+                if is_fresh(task):
+                    skipped += 1
+                    reporter.advance(len(task.frames))
+                    continue
+
+                try:
+                    size = sheet_size(task.png_path)
+                except Exception as e:
+                    reporter.status(f"Error processing {task.png_path}: {str(e)}")
+                    continue
+                sheet_bytes = rgba_bytes(*size)
+
+                if raw_cache.is_large(size):
+                    submit_large_sheet(queue, task, size, output_path, raw_cache, backend, workers, encode,
+                                       reporter)
+                    continue
+
+                if backend == 'processes':
+                    # Shipping a decoded sheet to other processes costs more than
+                    # encoding it, so each process takes whole sheets
+                    queue.submit(process_sprite_sheet, task, output_path, encode, cost=sheet_bytes)
+                    continue
+
+                # Sheets are decoded one at a time on this thread while their frames
+                # are encoded on the pool; the queue window and memory budget bound
+                # how many frames (and so how many decoded sheets) are held at once.
+                # Each frame carries an equal share of its sheet's bytes.
+                queue.reserve(sheet_bytes)
+                sheet_stats = StageStats()
+                try:
+                    image, frame_output_dir = open_sheet(task, output_path, sheet_stats)
+                except Exception as e:
+                    reporter.status(f"Error processing {task.png_path}: {str(e)}")
+                    continue
+                finally:
+                    reporter.stages(sheet_stats)
+                share = sheet_bytes // max(1, len(task.frames))
+                for frame in task.frames:
+                    queue.submit(save_frames, image, [frame], frame_output_dir, task.png_path, None, encode,
+                                 task.clockwise, cost=share + frame_bytes(frame))
+    finally:
+        manifest.save()
+
+    if skipped:
+        reporter.status(f"Skipped {skipped} unchanged sheets")
+    reporter.status(f"Extracted {total_frames} frames")
+    reporter.finish()
+    return total_frames
+
+
+def frame_bytes(frame):
+    return rgba_bytes(frame.frame_width, frame.frame_height)
+
+
+def submit_large_sheet(queue, task, size, output_path, raw_cache, backend, workers, encode, reporter):
+    # Large sheets are decoded once into a raw RGBA file and frames are cut
+    # from a read-only map of it: threads share this process's map, worker
+    # processes map the same file. Only the frames count against the budget.
+    queue.reserve(rgba_bytes(*size))
+    sheet_stats = StageStats()
+    try:
+        raw_path = raw_cache.prepare(task.png_path, sheet_stats, reporter.checkpoint)
+        frame_output_dir = prepare_output(task, output_path, size)
+    except Exception as e:
+        reporter.status(f"Error processing {task.png_path}: {str(e)}")
+        return
+    finally:
+        reporter.stages(sheet_stats)
+
+    if backend == 'processes':
+        for chunk in chunked(task.frames, chunk_size(len(task.frames), workers, backend)):
+            queue.submit(save_raw_frames, raw_path, chunk, frame_output_dir, task.png_path, encode,
+                         task.clockwise, cost=sum(frame_bytes(frame) for frame in chunk))
+        return
+
+    image = RawSheet(raw_path).image
+    for frame in task.frames:
+        queue.submit(save_frames, image, [frame], frame_output_dir, task.png_path, None, encode,
+                     task.clockwise, cost=frame_bytes(frame))
+
+
+def load_rgba(path):
+    # convert() always copies, so skip it when the PNG already decodes to RGBA
+    with Image.open(path) as image:
+        image.load()
+        if image.mode == "RGBA":
+            return image
+        return image.convert("RGBA")
+
+
+def open_sheet(task, output_path, stats):
+    with stats.time('decode', items=1, nbytes=os.path.getsize(task.png_path)):
+        image = load_rgba(task.png_path)
+
+    return image, prepare_output(task, output_path, image.size)
+
+
+def prepare_output(task, output_path, size):
+    frame_output_dir = os.path.join(output_path, task.relative_path, task.frame_dir_name)
+    os.makedirs(frame_output_dir, exist_ok=True)
+
+    if task.write_marker:
+        width, height = size
+        canvas_size_file = os.path.join(frame_output_dir, f"{width}x{height}.txt")
+        with open(canvas_size_file, 'w') as f:
+            f.write(f"Original dimensions: {width}x{height}")
+
+    return frame_output_dir
+
+
+def render_frame(sheet, frame, clockwise=True):
+    # clockwise says which way the atlas format stores rotated frames; they
+    # are turned back the other way
+    sprite_crop = sheet.crop((frame.x, frame.y, frame.x + frame.width, frame.y + frame.height))
+    if frame.rotated:
+        sprite_crop = sprite_crop.transpose(Image.ROTATE_90 if clockwise else Image.ROTATE_270)
+
+    paste_x = -frame.frame_x if frame.frame_x < 0 else 0
+    paste_y = -frame.frame_y if frame.frame_y < 0 else 0
+    if sprite_crop.size == (frame.frame_width, frame.frame_height) and paste_x == paste_y == 0:
+        return sprite_crop
+
+    frame_image = Image.new("RGBA", (frame.frame_width, frame.frame_height), (0, 0, 0, 0))
+    frame_image.paste(sprite_crop, (paste_x, paste_y))
+    return frame_image
+
+
+def save_frames(sheet, frames, frame_output_dir, png_path, stats=None, profile='balanced', clockwise=True):
+    stats = stats or StageStats()
+    saved = 0
+    errors = []
+    for frame in frames:
+        try:
+            frame_path = os.path.join(frame_output_dir, f"{frame.name}.png")
+            with stats.time('crop', items=1):
+                frame_image = render_frame(sheet, frame, clockwise)
+            write_image(frame_image, frame_path, stats, profile=profile)
+            saved += 1
+        except Exception as e:
+            errors.append(f"Error processing {png_path}: {str(e)}")
+    return png_path, saved, errors, stats
+
+
+def process_sprite_sheet(task, output_path, profile='balanced'):
+    stats = StageStats()
+    try:
+        image, frame_output_dir = open_sheet(task, output_path, stats)
+    except Exception as e:
+        return task.png_path, 0, [f"Error processing {task.png_path}: {str(e)}"], stats
+    return save_frames(image, task.frames, frame_output_dir, task.png_path, stats, profile, task.clockwise)
+
+
+def save_raw_frames(raw_path, frames, frame_output_dir, png_path, profile='balanced', clockwise=True):
+    # Runs in a worker process; the map stays open across chunks of the same sheet
+    stats = StageStats()
+    try:
+        sheet = open_raw_sheet(raw_path)
+    except Exception as e:
+        return png_path, 0, [f"Error processing {png_path}: {str(e)}" for _ in frames], stats
+    return save_frames(sheet, frames, frame_output_dir, png_path, stats, profile, clockwise)
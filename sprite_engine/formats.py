@@ -0,0 +1,297 @@
+import json
+import os
+import re
+
+from .atlas import SIGNATURE, Atlas, Frame, read_atlas, serialize_atlas, to_int
+
+# Enough of the file to tell the formats apart without reading it twice
+SNIFF_BYTES = 4096
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+JSON_FRAMES = re.compile(rb'"frames"\s*:\s*([\[{])')
+
+
+def strip_image_extension(name):
+    root, extension = os.path.splitext(name)
+    return root if extension.lower() in IMAGE_EXTENSIONS else name
+
+
+def unrotated_size(frame):
+    # Frame width/height are sheet space; JSON and Spine store the sprite's own size
+    return (frame.height, frame.width) if frame.rotated else (frame.width, frame.height)
+
+
+class AtlasFormat:
+    # A format reads a file into a list of Atlas pages and serializes pages
+    # back to bytes. Multipage formats keep every page in one file; the others
+    # write one file per page. signature marks files this engine wrote.
+    # clockwise is the direction rotated frames are stored in the sheet.
+    name = None
+    extensions = ()
+    multipage = False
+    signature = None
+    clockwise = True
+
+    def sniff(self, head):
+        return False
+
+    def signed(self, head):
+        return self.signature is not None and self.signature in head
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def serialize(self, pages):
+        raise NotImplementedError
+
+    def image_name(self, page_name, extension='.png'):
+        return f"{page_name}{extension}"
+
+    def file_stem(self, file_name):
+        lower = file_name.lower()
+        for extension in self.extensions:
+            if lower.endswith(extension):
+                return file_name[:-len(extension)]
+        return None
+
+
+class SparrowFormat(AtlasFormat):
+    name = 'sparrow'
+    extensions = ('.xml',)
+    signature = SIGNATURE.encode('utf-8')
+
+    def sniff(self, head):
+        return b'<TextureAtlas' in head
+
+    def read(self, path):
+        return [read_atlas(path)]
+
+    def serialize(self, pages):
+        return serialize_atlas(pages[0])
+
+    def image_name(self, page_name, extension='.png'):
+        return page_name
+
+
+class JsonFormat(AtlasFormat):
+    # TexturePacker JSON. Both layouts are accepted when reading, whichever
+    # one was sniffed; frame w/h are the unrotated sprite size. meta is
+    # written first so the signature falls inside the sniffed head.
+    extensions = ('.json',)
+    layout = None
+    signature = b'"app":"sprite_engine"'
+
+    def sniff(self, head):
+        match = JSON_FRAMES.search(head)
+        return match is not None and match.group(1) == self.layout
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            data = json.load(f)
+        meta = data.get('meta', {})
+        size = meta.get('size')
+        frames = data['frames']
+        if isinstance(frames, dict):
+            entries = frames.items()
+        else:
+            entries = ((entry['filename'], entry) for entry in frames)
+        return [Atlas(
+            meta.get('image'),
+            [self.read_frame(name, entry) for name, entry in entries],
+            (to_int(size['w']), to_int(size['h'])) if size else None,
+        )]
+
+    def read_frame(self, name, entry):
+        rect = entry['frame']
+        rotated = bool(entry.get('rotated', False))
+        width, height = to_int(rect['w']), to_int(rect['h'])
+        source = entry.get('spriteSourceSize', {})
+        source_size = entry.get('sourceSize', {})
+        return Frame(
+            strip_image_extension(name),
+            to_int(rect['x']),
+            to_int(rect['y']),
+            height if rotated else width,
+            width if rotated else height,
+            -to_int(source.get('x', 0)),
+            -to_int(source.get('y', 0)),
+            to_int(source_size.get('w', width)),
+            to_int(source_size.get('h', height)),
+            rotated,
+        )
+
+    def entry(self, frame):
+        width, height = unrotated_size(frame)
+        return {
+            'frame': {'x': frame.x, 'y': frame.y, 'w': width, 'h': height},
+            'rotated': frame.rotated,
+            'trimmed': (width, height) != (frame.frame_width, frame.frame_height),
+            'spriteSourceSize': {'x': -frame.frame_x, 'y': -frame.frame_y, 'w': width, 'h': height},
+            'sourceSize': {'w': frame.frame_width, 'h': frame.frame_height},
+        }
+
+    def meta(self, atlas):
+        meta = {'app': 'sprite_engine', 'image': atlas.image_path, 'format': 'RGBA8888', 'scale': '1'}
+        if atlas.size:
+            meta['size'] = {'w': atlas.size[0], 'h': atlas.size[1]}
+        return meta
+
+    def serialize(self, pages):
+        atlas = pages[0]
+        frames = sorted(atlas.frames, key=lambda frame: frame.name)
+        if self.layout == b'{':
+            body = {f"{frame.name}.png": self.entry(frame) for frame in frames}
+        else:
+            body = [dict(filename=f"{frame.name}.png", **self.entry(frame)) for frame in frames]
+        data = {'meta': self.meta(atlas), 'frames': body}
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+class JsonHashFormat(JsonFormat):
+    name = 'json-hash'
+    layout = b'{'
+
+
+class JsonArrayFormat(JsonFormat):
+    name = 'json-array'
+    layout = b'['
+
+
+class SpineFormat(AtlasFormat):
+    # libGDX/Spine text atlas. Reads the 3.x (xy/size/orig/offset) and 4.x
+    # (bounds/offsets) region fields and writes 3.x, which both runtimes load.
+    # Offsets are measured from the bottom-left of the original frame, and
+    # rotated regions are stored turned 90 degrees counter-clockwise.
+    name = 'spine'
+    extensions = ('.atlas', '.atlas.txt')
+    multipage = True
+    clockwise = False
+
+    def sniff(self, head):
+        lines = [line.strip() for line in head.decode('utf-8', 'replace').splitlines() if line.strip()]
+        return (
+            len(lines) >= 2
+            and lines[0].lower().endswith(IMAGE_EXTENSIONS)
+            and ':' not in lines[0]
+            and ':' in lines[1]
+        )
+
+    def read(self, path):
+        pages = []
+        page = None
+        region = None
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    page = region = None
+                    continue
+                if page is None:
+                    page = Atlas(line, [])
+                    pages.append(page)
+                    continue
+                if ':' not in line:
+                    region = {'name': line}
+                    page.frames.append(region)
+                    continue
+                key, value = (part.strip() for part in line.split(':', 1))
+                values = [part.strip() for part in value.split(',')]
+                if region is not None:
+                    region[key] = values
+                elif key == 'size':
+                    page.size = (to_int(values[0]), to_int(values[1]))
+        for page in pages:
+            page.frames = [self.read_frame(region) for region in page.frames]
+        return pages
+
+    def read_frame(self, region):
+        if 'bounds' in region:
+            x, y, width, height = map(to_int, region['bounds'])
+        else:
+            x, y = map(to_int, region['xy'])
+            width, height = map(to_int, region['size'])
+        if 'offsets' in region:
+            offset_x, offset_y, frame_width, frame_height = map(to_int, region['offsets'])
+        else:
+            offset_x, offset_y = map(to_int, region.get('offset', (0, 0)))
+            frame_width, frame_height = map(to_int, region.get('orig', (width, height)))
+
+        rotate = region.get('rotate', ['false'])[0].lower()
+        if rotate in ('true', '90'):
+            rotated = True
+        elif rotate in ('false', '0'):
+            rotated = False
+        else:
+            raise ValueError(f"Unsupported rotation {rotate} for {region['name']}")
+
+        name = region['name']
+        index = to_int(region.get('index', ['-1'])[0])
+        if index >= 0:
+            name = f"{name}_{index}"
+        return Frame(
+            name,
+            x,
+            y,
+            height if rotated else width,
+            width if rotated else height,
+            -offset_x,
+            -(frame_height - height - offset_y),
+            frame_width,
+            frame_height,
+            rotated,
+        )
+
+    def serialize(self, pages):
+        lines = []
+        for atlas in pages:
+            lines.append('')
+            lines.append(atlas.image_path)
+            if atlas.size:
+                lines.append(f"size: {atlas.size[0]},{atlas.size[1]}")
+            lines.append('format: RGBA8888')
+            lines.append('filter: Linear,Linear')
+            lines.append('repeat: none')
+            for frame in sorted(atlas.frames, key=lambda frame: frame.name):
+                width, height = unrotated_size(frame)
+                lines.append(frame.name)
+                lines.append(f"  rotate: {'true' if frame.rotated else 'false'}")
+                lines.append(f"  xy: {frame.x}, {frame.y}")
+                lines.append(f"  size: {width}, {height}")
+                lines.append(f"  orig: {frame.frame_width}, {frame.frame_height}")
+                lines.append(f"  offset: {-frame.frame_x}, {frame.frame_height - height + frame.frame_y}")
+                lines.append('  index: -1')
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+FORMATS = {
+    fmt.name: fmt
+    for fmt in (SparrowFormat(), JsonHashFormat(), JsonArrayFormat(), SpineFormat())
+}
+ATLAS_EXTENSIONS = tuple(sorted({extension for fmt in FORMATS.values() for extension in fmt.extensions}))
+
+
+def get_format(name):
+    try:
+        return FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown atlas format: {name}") from None
+
+
+def read_head(path):
+    with open(path, 'rb') as f:
+        return f.read(SNIFF_BYTES)
+
+
+def sniff_format(path, head=None):
+    # Returns the format matching the head of the file (read here unless the
+    # caller already has it), or None when the file is not an atlas this
+    # engine understands
+    lower = path.lower()
+    candidates = [fmt for fmt in FORMATS.values() if lower.endswith(fmt.extensions)]
+    if not candidates:
+        return None
+    if head is None:
+        head = read_head(path)
+    for fmt in candidates:
+        if fmt.sniff(head):
+            return fmt
+    return None
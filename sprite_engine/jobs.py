@@ -0,0 +1,207 @@
+import itertools
+import queue
+import threading
+import time
+
+from .report import EventReporter
+
+JOB_IDS = itertools.count(1)
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+
+class JobCancelled(BaseException):
+    # Not an Exception, so the engines' per-item error handling lets it through
+    pass
+
+
+class Job:
+    # One engine call run by the scheduler. Pausing and cancelling take effect
+    # at the job's next checkpoint: every report, and between the atlases,
+    # folders and frames the engines work through.
+
+    def __init__(self, name, fn, args=(), kwargs=None, key=None):
+        self.id = next(JOB_IDS)
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.key = key
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self.running = threading.Event()
+        self.running.set()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.running.set()
+
+    def pause(self):
+        if not self.cancelled.is_set():
+            self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def checkpoint(self):
+        self.running.wait()
+        if self.cancelled.is_set():
+            raise JobCancelled(f"{self.name} was cancelled")
+
+
+class JobReporter(EventReporter):
+    # Event reporter that doubles as the job's checkpoint: while the job is
+    # paused every report blocks, and once it is cancelled they raise
+    # JobCancelled, which unwinds the engine the same way an error would
+
+    def __init__(self, job, sinks=(), interval=0.1):
+        super().__init__(sinks, job=job.id, interval=interval)
+        self.control = job
+
+    def start(self, total):
+        self.control.checkpoint()
+        super().start(total)
+
+    def advance(self, value=1):
+        self.control.checkpoint()
+        super().advance(value)
+
+    def status(self, message):
+        self.control.checkpoint()
+        super().status(message)
+
+    def stages(self, stats):
+        self.control.checkpoint()
+        super().stages(stats)
+
+    def checkpoint(self):
+        self.control.checkpoint()
+
+
+class JobScheduler:
+    # Runs jobs one at a time on a background thread, in the order they were
+    # submitted, so runs never overlap and the caller's thread stays free.
+    # Job state changes go to the same sinks as the jobs' progress events;
+    # sinks are called from the background thread, so a UI must marshal them
+    # onto its own thread.
+
+    def __init__(self, sinks=(), interval=0.1):
+        self.sinks = list(sinks)
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.jobs = []
+        self.current = None
+        self.gate = threading.Event()
+        self.gate.set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+
+    def submit(self, name, fn, *args, key=None, **kwargs):
+        # fn is called as fn(*args, reporter=..., **kwargs). Returns None
+        # instead of queueing when a job with the same key is still pending.
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Job scheduler is shut down")
+            if key is not None and any(job.key == key for job in self.jobs):
+                return None
+            job = Job(name, fn, args, kwargs, key)
+            self.jobs.append(job)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='sprite-jobs', daemon=True)
+                self.thread.start()
+        self.emit(job)
+        self.queue.put(job)
+        return job
+
+    def emit(self, job):
+        event = {
+            'type': 'job', 'job': job.id, 'time': time.time(),
+            'name': job.name, 'state': job.state, 'error': job.error,
+        }
+        for sink in self.sinks:
+            sink(event)
+
+    def pending(self):
+        with self.lock:
+            return list(self.jobs)
+
+    def busy(self):
+        with self.lock:
+            return bool(self.jobs)
+
+    def cancel(self, job=None):
+        # Cancels one job, or the running one when none is given
+        job = job or self.current
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        # Also lifts a pause, so queued jobs can be skipped instead of held
+        for job in self.pending():
+            job.cancel()
+        self.gate.set()
+
+    def pause(self):
+        # Holds the running job at its next checkpoint and keeps queued ones waiting
+        self.gate.clear()
+        current = self.current
+        if current is not None:
+            current.pause()
+
+    def resume(self):
+        self.gate.set()
+        current = self.current
+        if current is not None:
+            current.resume()
+
+    @property
+    def paused(self):
+        return not self.gate.is_set()
+
+    def shutdown(self, wait=False, timeout=None):
+        with self.lock:
+            self.closed = True
+        self.cancel_all()
+        self.gate.set()
+        self.queue.put(None)
+        if wait and self.thread is not None:
+            self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            self.gate.wait()
+            if job.cancelled.is_set():
+                self._finish(job, 'cancelled')
+                continue
+
+            with self.lock:
+                self.current = job
+                job.state = 'running'
+            if self.paused:
+                job.pause()
+            self.emit(job)
+
+            reporter = JobReporter(job, self.sinks, self.interval)
+            try:
+                job.result = job.fn(*job.args, reporter=reporter, **job.kwargs)
+                state = 'done'
+            except JobCancelled:
+                state = 'cancelled'
+            except Exception as e:
+                job.error = str(e)
+                state = 'failed'
+            self._finish(job, state)
+
+    def _finish(self, job, state):
+        with self.lock:
+            job.state = state
+            if job in self.jobs:
+                self.jobs.remove(job)
+            if self.current is job:
+                self.current = None
+        self.emit(job)
@@ -0,0 +1,298 @@
+import os
+import shutil
+from functools import partial
+
+from PIL import Image
+
+from .atlas import Atlas, Frame
+from .cache import open_manifest, options_digest
+from .dedupe import DedupeIndex
+from .encode import get_profile, write_bytes, write_image
+from .formats import get_format
+from .executor import TaskQueue, default_workers, make_executor
+from .packer import pack_pages
+from .report import Reporter, StageStats
+from .trim import extrude_image, trim_frames
+
+
+class PackOptions:
+    def __init__(self, algorithm='maxrects', sort='area', padding=2, max_size=None,
+                 power_of_two=False, alpha_threshold=0, margin=0, extrude=0, formats=('sparrow',),
+                 encode='balanced', allow_rotation=False):
+        self.algorithm = algorithm
+        self.sort = sort
+        self.padding = padding
+        self.max_size = max_size
+        self.power_of_two = power_of_two
+        self.alpha_threshold = alpha_threshold
+        self.margin = margin
+        self.extrude = extrude
+        self.formats = tuple(formats)
+        self.encode = encode
+        self.allow_rotation = allow_rotation
+
+
+def atlas_formats(names, allow_rotation=False):
+    formats = [get_format(name) for name in names]
+    extensions = [fmt.extensions[0] for fmt in formats]
+    if len(set(extensions)) != len(extensions):
+        raise ValueError(f"Atlas formats {', '.join(names)} would write to the same file")
+    # Every format shares one sheet, which stores rotated frames clockwise
+    if allow_rotation:
+        for fmt in formats:
+            if not fmt.clockwise:
+                raise ValueError(f"The {fmt.name} format stores rotated frames counter-clockwise; "
+                                 "pack it without rotation")
+    return formats
+
+
+def create_sprites(input_path, output_path, jobs=None, reporter=None, options=None, backend='threads',
+                   cache=True):
+    reporter = reporter or Reporter()
+    options = options or PackOptions()
+    atlas_formats(options.formats, options.allow_rotation)
+    get_profile(options.encode)
+    stats = StageStats()
+    with stats.time('scan'):
+        image_folders = find_leaf_folders(input_path)
+    reporter.stages(stats)
+    total_folders = len(image_folders)
+
+    if total_folders == 0:
+        reporter.status("No image folders found")
+        reporter.finish()
+        return 0
+
+    reporter.start(total_folders)
+
+    manifest = open_manifest(output_path, cache)
+    options_key = options_digest('pack', options)
+    pending = {}
+    skipped = 0
+    packed = []
+
+    def on_result(result):
+        folder, outputs, messages, errors, worker_stats = result
+        reporter.stages(worker_stats)
+        for message in messages + errors:
+            reporter.status(message)
+        key, inputs = pending.pop(folder)
+        if not errors:
+            manifest.record(key, inputs, options_key, outputs)
+            packed.append(folder)
+        reporter.advance(1)
+
+    # Worker processes cannot call back into the reporter, so they only stop between folders
+    checkpoint = reporter.checkpoint if backend != 'processes' else None
+    workers = default_workers(backend, jobs)
+    try:
+        with make_executor(backend, jobs) as executor, TaskQueue(executor, workers * 2, on_result) as queue:
+            for folder in image_folders:
+                reporter.checkpoint()
+                key = f"pack:{os.path.relpath(folder, input_path)}"
+                sources = [
+                    os.path.join(folder, file) for file in os.listdir(folder)
+                    if file.endswith(('png', 'jpg', 'jpeg', '.txt'))
+                ]
+                inputs = manifest.inputs_digest(sources, input_path)
+                if manifest.is_fresh(key, inputs, options_key):
+                    skipped += 1
+                    reporter.advance(1)
+                    continue
+                pending[folder] = (key, inputs)
+                queue.submit(pack_folder, folder, input_path, output_path, options, checkpoint)
+    finally:
+        manifest.save()
+
+    if skipped:
+        reporter.status(f"Skipped {skipped} unchanged folders")
+
+    # Skipped and failed folders are not counted
+    created = len(packed)
+    reporter.status(f"Created {created} sprite sheets")
+    reporter.finish()
+    return created
+
+
+def pack_folder(folder, input_path, output_path, options=None, checkpoint=None):
+    # Returns the files written, status messages and errors instead of
+    # reporting them, so it can run in a worker process. A folder that fails
+    # is reported and the rest of the batch carries on.
+    options = options or PackOptions()
+    stats = StageStats()
+    relative_path = os.path.relpath(folder, input_path)
+    final_output_dir = os.path.join(output_path, os.path.dirname(relative_path))
+    os.makedirs(final_output_dir, exist_ok=True)
+
+    original_folder_name = os.path.basename(folder)
+    with stats.time('scan'):
+        image_files = sorted([file for file in os.listdir(folder) if file.endswith(('png', 'jpg', 'jpeg'))])
+
+    load = partial(load_folder_frame, folder, stats)
+    try:
+        outputs, messages = pack_frames(original_folder_name, image_files, load, final_output_dir, options, stats,
+                                        checkpoint)
+    except Exception as e:
+        return folder, [], [], [f"Error packing {folder}: {str(e)}"], stats
+
+    txt_path = os.path.join(folder, f"{original_folder_name}.txt")
+    if os.path.exists(txt_path):
+        shutil.copy2(txt_path, os.path.join(final_output_dir, f"{original_folder_name}.txt"))
+        outputs.append(os.path.join(final_output_dir, f"{original_folder_name}.txt"))
+
+    return folder, outputs, messages, [], stats
+
+
+def pack_frames(name, image_files, load, output_dir, options, stats, checkpoint=None):
+    # Packs the frames `load(file_name, bbox=None)` returns into name.png (or
+    # name-0.png, name-1.png, ...) plus one atlas per requested format, and
+    # returns the files written and status messages. checkpoint, when given,
+    # is called before each frame is loaded.
+    formats = atlas_formats(options.formats, options.allow_rotation)
+    profile = get_profile(options.encode)
+    outputs = []
+    messages = []
+
+    original_sizes = {}
+    bboxes = {}
+    trimmed_sizes = {}
+    region_of = {}
+    dedupe = DedupeIndex()
+
+    # Phase 1 streams the frames one at a time and keeps only metadata: source
+    # size, trimmed bbox and dedupe digest. Frames are deduplicated after
+    # trimming, so frames that only differ in transparent padding share one
+    # packed region.
+    frames = trim_frames(image_files, options.alpha_threshold, options.margin, load, stats)
+    for frame in frames:
+        if checkpoint is not None:
+            checkpoint()
+        original_sizes[frame.name] = frame.source_size
+        bboxes[frame.name] = frame.bbox
+        reload = partial(load, frame.name, frame.bbox)
+        original_file_name = dedupe.find_or_add(frame.name, frame.image, reload)
+        if original_file_name is None:
+            trimmed_sizes[frame.name] = frame.image.size
+            region_of[frame.name] = frame.name
+        else:
+            region_of[frame.name] = original_file_name
+
+    # Extruded edges are part of each packed region but not of the SubTexture
+    extrude = options.extrude
+    with stats.time('pack', items=len(trimmed_sizes)):
+        pages = pack_pages(
+            [(file_name, width + 2 * extrude, height + 2 * extrude)
+             for file_name, (width, height) in trimmed_sizes.items()],
+            algorithm=options.algorithm,
+            sort=options.sort,
+            padding=options.padding,
+            max_size=options.max_size,
+            power_of_two=options.power_of_two,
+            allow_rotation=options.allow_rotation,
+        )
+    page_names = page_file_names(name, len(pages))
+    page_of = {}
+    placement_of = {}
+    for page_index, layout in enumerate(pages):
+        for file_name, placement in layout.placements.items():
+            page_of[file_name] = page_index
+            placement_of[file_name] = placement
+
+    page_sprites = [[] for _ in pages]
+    for file_name in image_files:
+        region = region_of[file_name]
+        placement = placement_of[region]
+        original_size = original_sizes[file_name]
+        bbox = bboxes[file_name]
+        page_sprites[page_of[region]].append(Frame(
+            os.path.splitext(file_name)[0],
+            placement.x + extrude,
+            placement.y + extrude,
+            placement.width - 2 * extrude,
+            placement.height - 2 * extrude,
+            -bbox[0],
+            -bbox[1],
+            original_size[0],
+            original_size[1],
+            placement.rotated,
+        ))
+
+    # Phase 2 loads the frames again and blits them straight into the page, so
+    # when they come from files peak memory is one sheet plus one frame
+    # Multipage formats collect every page and write one file per folder
+    collected = {fmt.name: [] for fmt in formats if fmt.multipage}
+    for page_name, layout, sprites in zip(page_names, pages, page_sprites):
+        spritesheet = Image.new("RGBA", (layout.width, layout.height), (0, 0, 0, 0))
+        for file_name, placement in layout.placements.items():
+            if checkpoint is not None:
+                checkpoint()
+            img = load(file_name, bboxes[file_name])
+            with stats.time('blit', items=1):
+                img = extrude_image(img, extrude)
+                if placement.rotated:
+                    # Stored clockwise; the extractor turns it back with ROTATE_90
+                    img = img.transpose(Image.ROTATE_270)
+                spritesheet.paste(img, (placement.x, placement.y))
+
+        spritesheet_path = os.path.join(output_dir, f"{page_name}{profile.extension}")
+        write_image(spritesheet, spritesheet_path, stats, profile=profile)
+        outputs.append(spritesheet_path)
+
+        for fmt in formats:
+            atlas = Atlas(fmt.image_name(page_name, profile.extension), sprites, (layout.width, layout.height))
+            if fmt.multipage:
+                collected[fmt.name].append(atlas)
+                continue
+            atlas_path = os.path.join(output_dir, f"{page_name}{fmt.extensions[0]}")
+            write_bytes(fmt.serialize([atlas]), atlas_path, stats)
+            outputs.append(atlas_path)
+
+        messages.append(
+            f"Packed {page_name}: {layout.width}x{layout.height}, "
+            f"{layout.fill_ratio:.0%} filled"
+        )
+
+    for fmt in formats:
+        if fmt.multipage:
+            atlas_path = os.path.join(output_dir, f"{name}{fmt.extensions[0]}")
+            write_bytes(fmt.serialize(collected[fmt.name]), atlas_path, stats)
+            outputs.append(atlas_path)
+
+    return outputs, messages
+
+
+def page_file_names(name, page_count):
+    if page_count == 1:
+        return [name]
+    return [f"{name}-{index}" for index in range(page_count)]
+
+
+def find_leaf_folders(folder):
+    leaf_folders = []
+    for root, dirs, files in os.walk(folder):
+        image_files = [f for f in files if f.lower().endswith(('png', 'jpg', 'jpeg'))]
+        if image_files:
+            leaf_folders.append(root)
+    return leaf_folders
+
+
+def load_frame(path):
+    with Image.open(path) as img:
+        img.load()
+        if img.mode != "RGBA":
+            return img.convert("RGBA")
+        return img
+
+
+def crop_to(img, bbox=None):
+    if bbox is None or bbox == (0, 0, img.width, img.height):
+        return img
+    return img.crop(bbox)
+
+
+def load_folder_frame(folder, stats, file_name, bbox=None):
+    path = os.path.join(folder, file_name)
+    with stats.time('decode', items=1, nbytes=os.path.getsize(path)):
+        img = load_frame(path)
+    return crop_to(img, bbox)
+
@@ -0,0 +1,395 @@
+import math
+
+class PackError(ValueError):
+    pass
+
+
+SORT_KEYS = {
+    'area': lambda item: (item[1] * item[2], max(item[1], item[2])),
+    'max_side': lambda item: (max(item[1], item[2]), min(item[1], item[2])),
+    'height': lambda item: (item[2], item[1]),
+    'width': lambda item: (item[1], item[2]),
+    'perimeter': lambda item: (item[1] + item[2], item[1] * item[2]),
+}
+
+
+class Rect:
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    def contains(self, other):
+        return (self.x <= other.x and self.y <= other.y
+                and self.right >= other.right and self.bottom >= other.bottom)
+
+    def intersects(self, other):
+        return (self.x < other.right and other.x < self.right
+                and self.y < other.bottom and other.y < self.bottom)
+
+    def __repr__(self):
+        return f"Rect({self.x}, {self.y}, {self.width}, {self.height})"
+
+
+def orientations(width, height, allow_rotation=False):
+    # The upright size comes first so ties keep the frame unrotated
+    if allow_rotation and width != height:
+        return ((width, height), (height, width))
+    return ((width, height),)
+
+
+class MaxRectsPacker:
+    # MaxRects with the best-short-side-fit rule. Free space is kept as
+    # (left, top, right, bottom) tuples, which the inner loops compare directly.
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0, 0, width, height)]
+
+    def insert(self, width, height, allow_rotation=False):
+        # With allow_rotation the item may come back as a height x width rect
+        best = None
+        best_short = best_long = math.inf
+        sizes = orientations(width, height, allow_rotation)
+        for left, top, right, bottom in self.free:
+            free_width = right - left
+            free_height = bottom - top
+            for item_width, item_height in sizes:
+                if free_width < item_width or free_height < item_height:
+                    continue
+                leftover_x = free_width - item_width
+                leftover_y = free_height - item_height
+                short, long = min(leftover_x, leftover_y), max(leftover_x, leftover_y)
+                if short < best_short or (short == best_short and long < best_long):
+                    best = Rect(left, top, item_width, item_height)
+                    best_short, best_long = short, long
+
+        if best is not None:
+            self._place(best)
+        return best
+
+    def _place(self, used):
+        used_left, used_top, used_right, used_bottom = used.x, used.y, used.right, used.bottom
+        kept = []
+        pieces = []
+        for free in self.free:
+            left, top, right, bottom = free
+            if left >= used_right or used_left >= right or top >= used_bottom or used_top >= bottom:
+                kept.append(free)
+                continue
+            if used_left > left:
+                pieces.append((left, top, used_left, bottom))
+            if used_right < right:
+                pieces.append((used_right, top, right, bottom))
+            if used_top > top:
+                pieces.append((left, top, right, used_top))
+            if used_bottom < bottom:
+                pieces.append((left, used_bottom, right, bottom))
+
+        # Drop free rectangles fully covered by another one. The untouched ones
+        # were already pruned against each other, and a piece lies inside the
+        # rectangle it was cut from, so only the new pieces need checking.
+        fresh = []
+        for i, piece in enumerate(pieces):
+            left, top, right, bottom = piece
+            # Of two identical pieces only the first is kept
+            if any(j != i and other[0] <= left and other[1] <= top and other[2] >= right
+                   and other[3] >= bottom and (other != piece or j < i)
+                   for j, other in enumerate(pieces)):
+                continue
+            if any(other[0] <= left and other[1] <= top and other[2] >= right and other[3] >= bottom
+                   for other in kept):
+                continue
+            fresh.append(piece)
+        self.free = kept + fresh
+
+
+class SkylinePacker:
+    # Skyline with the bottom-left rule
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.skyline = [[0, 0, width]]
+
+    def _fit(self, index, width, height):
+        x = self.skyline[index][0]
+        if x + width > self.width:
+            return None
+        y = 0
+        remaining = width
+        i = index
+        while remaining > 0:
+            if i == len(self.skyline):
+                return None
+            y = max(y, self.skyline[i][1])
+            if y + height > self.height:
+                return None
+            remaining -= self.skyline[i][2]
+            i += 1
+        return y
+
+    def insert(self, width, height, allow_rotation=False):
+        best_index = None
+        best_bottom = best_width = math.inf
+        best_y = 0
+        best_size = None
+        for index, (x, y, segment_width) in enumerate(self.skyline):
+            for item_width, item_height in orientations(width, height, allow_rotation):
+                fit_y = self._fit(index, item_width, item_height)
+                if fit_y is None:
+                    continue
+                bottom = fit_y + item_height
+                if bottom < best_bottom or (bottom == best_bottom and segment_width < best_width):
+                    best_index, best_y, best_size = index, fit_y, (item_width, item_height)
+                    best_bottom, best_width = bottom, segment_width
+
+        if best_index is None:
+            return None
+
+        rect = Rect(self.skyline[best_index][0], best_y, best_size[0], best_size[1])
+        self._add_level(best_index, rect)
+        return rect
+
+    def _add_level(self, index, rect):
+        self.skyline.insert(index, [rect.x, rect.bottom, rect.width])
+        i = index + 1
+        while i < len(self.skyline):
+            x, y, width = self.skyline[i]
+            overlap = rect.right - x
+            if overlap <= 0:
+                break
+            if overlap >= width:
+                del self.skyline[i]
+                continue
+            self.skyline[i] = [x + overlap, y, width - overlap]
+            break
+
+        i = 0
+        while i < len(self.skyline) - 1:
+            if self.skyline[i][1] == self.skyline[i + 1][1]:
+                self.skyline[i][2] += self.skyline[i + 1][2]
+                del self.skyline[i + 1]
+            else:
+                i += 1
+
+
+ALGORITHMS = {
+    'maxrects': MaxRectsPacker,
+    'skyline': SkylinePacker,
+}
+
+
+class Placement:
+    # width and height are the size in the sheet; a rotated item was turned
+    # 90 degrees clockwise, so they are its own height and width
+    __slots__ = ('key', 'x', 'y', 'width', 'height', 'rotated')
+
+    def __init__(self, key, x, y, width, height, rotated=False):
+        self.key = key
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.rotated = rotated
+
+
+class PackResult:
+    def __init__(self, width, height, placements):
+        self.width = width
+        self.height = height
+        self.placements = placements
+
+    @property
+    def used_area(self):
+        return sum(p.width * p.height for p in self.placements.values())
+
+    @property
+    def fill_ratio(self):
+        if not self.width or not self.height:
+            return 0.0
+        return self.used_area / (self.width * self.height)
+
+
+def next_power_of_two(value):
+    return 1 << max(0, math.ceil(math.log2(max(value, 1))))
+
+
+def power_of_two_sizes(min_width, min_height, min_area, max_size=None, limit=1 << 15):
+    # Candidate power-of-two bins no more than 2:1, smallest area first
+    limit = min(limit, max_size) if max_size else limit
+    sides = []
+    side = 1
+    while side <= limit:
+        sides.append(side)
+        side *= 2
+    sizes = [
+        (width, height)
+        for width in sides if width >= min_width
+        for height in sides if height >= min_height
+        if max(width, height) <= 2 * min(width, height)
+    ]
+    sizes.sort(key=lambda size: (size[0] * size[1], max(size)))
+    return [size for size in sizes if size[0] * size[1] >= min_area] or sizes[-1:]
+
+
+def sort_items(items, sort='area'):
+    if sort in (None, 'none'):
+        return list(items)
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort heuristic: {sort}")
+    return sorted(items, key=SORT_KEYS[sort], reverse=True)
+
+
+def place(packer, key, item_width, item_height, padding, allow_rotation):
+    rect = packer.insert(item_width + padding, item_height + padding, allow_rotation)
+    if rect is None:
+        return None
+    if rect.width != item_width + padding:
+        return Placement(key, rect.x, rect.y, item_height, item_width, rotated=True)
+    return Placement(key, rect.x, rect.y, item_width, item_height)
+
+
+def fill_bin(items, width, height, algorithm='maxrects', padding=0, allow_rotation=False):
+    # Places as many (key, width, height) items as fit in a width x height bin.
+    # Padding is added to the right and bottom of each item, so the bin itself is
+    # widened by the same amount to keep the outer edges tight.
+    packer = ALGORITHMS[algorithm](width + padding, height + padding)
+    placements = {}
+    rejected = []
+    for key, item_width, item_height in items:
+        placement = place(packer, key, item_width, item_height, padding, allow_rotation)
+        if placement is None:
+            rejected.append((key, item_width, item_height))
+        else:
+            placements[key] = placement
+    return placements, rejected
+
+
+def try_pack(items, width, height, algorithm='maxrects', padding=0, allow_rotation=False):
+    # Places every item in a width x height bin or returns None
+    packer = ALGORITHMS[algorithm](width + padding, height + padding)
+    placements = {}
+    for key, item_width, item_height in items:
+        placement = place(packer, key, item_width, item_height, padding, allow_rotation)
+        if placement is None:
+            return None
+        placements[key] = placement
+    return placements
+
+
+def crop_to_placements(placements, power_of_two=False):
+    used_width = max(p.x + p.width for p in placements.values())
+    used_height = max(p.y + p.height for p in placements.values())
+    if power_of_two:
+        used_width, used_height = next_power_of_two(used_width), next_power_of_two(used_height)
+    return PackResult(used_width, used_height, placements)
+
+
+def check_items(items, algorithm, max_size):
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown packing algorithm: {algorithm}")
+    if max_size:
+        for key, width, height in items:
+            if width > max_size or height > max_size:
+                raise ValueError(f"{key} ({width}x{height}) is larger than the maximum sheet size {max_size}")
+
+
+def search_side(items, low, algorithm, padding, max_size, allow_rotation):
+    # low is a lower bound on the square bin's side. The first guess allows for
+    # 5% waste; the side then grows until everything fits and is bisected back
+    # down to within 1% of the smallest side that still fits.
+    def attempt(side):
+        return try_pack(items, side, side, algorithm, padding, allow_rotation)
+
+    if max_size:
+        low = min(low, max_size)
+    side = math.ceil(low * 1.05)
+    while True:
+        if max_size:
+            side = min(side, max_size)
+        placements = attempt(side)
+        if placements is not None:
+            break
+        if max_size and side >= max_size:
+            raise PackError(f"Frames do not fit in {max_size}x{max_size}")
+        low = side + 1
+        side = math.ceil(side * 1.1)
+
+    while side - low > max(1, side // 100):
+        middle = (low + side) // 2
+        found = attempt(middle)
+        if found is None:
+            low = middle + 1
+        else:
+            placements, side = found, middle
+    return placements
+
+
+def pack_rects(items, algorithm='maxrects', sort='area', padding=2, max_size=None,
+               power_of_two=False, allow_rotation=False):
+    # Computes placements for (key, width, height) items using rectangles only, so the
+    # caller can allocate the final sheet exactly once
+    check_items(items, algorithm, max_size)
+    items = sort_items(items, sort)
+    if not items:
+        return PackResult(0, 0, {})
+
+    if allow_rotation:
+        # Either side may end up horizontal, so only the shorter one is a hard minimum
+        max_width = max_height = max(min(item[1], item[2]) for item in items)
+    else:
+        max_width = max(item[1] for item in items)
+        max_height = max(item[2] for item in items)
+    total_area = sum((w + padding) * (h + padding) for _, w, h in items)
+    side = max(math.ceil(math.sqrt(total_area)), max(max(item[1], item[2]) for item in items))
+
+    if power_of_two:
+        placements = None
+        for width, height in power_of_two_sizes(max_width, max_height, total_area, max_size):
+            placements = try_pack(items, width, height, algorithm, padding, allow_rotation)
+            if placements is not None:
+                break
+        if placements is None:
+            raise PackError("Frames do not fit in the largest allowed power-of-two sheet")
+    else:
+        placements = search_side(items, side, algorithm, padding, max_size, allow_rotation)
+
+    return crop_to_placements(placements, power_of_two)
+
+
+def pack_pages(items, algorithm='maxrects', sort='area', padding=2, max_size=None,
+               power_of_two=False, allow_rotation=False):
+    # Like pack_rects, but frames that overflow a max_size sheet spill onto further
+    # pages; every page except the last is filled to max_size before moving on
+    check_items(items, algorithm, max_size)
+    remaining = sort_items(items, sort)
+    if not max_size or not remaining:
+        return [pack_rects(remaining, algorithm, 'none', padding, max_size, power_of_two, allow_rotation)]
+
+    page_size = 1 << (max_size.bit_length() - 1) if power_of_two else max_size
+    pages = []
+    while remaining:
+        try:
+            pages.append(pack_rects(remaining, algorithm, 'none', padding, max_size, power_of_two,
+                                    allow_rotation))
+            break
+        except PackError:
+            pass
+        placements, remaining = fill_bin(remaining, page_size, page_size, algorithm, padding, allow_rotation)
+        if not placements:
+            raise PackError(f"{remaining[0][0]} does not fit in {page_size}x{page_size}")
+        pages.append(crop_to_placements(placements, power_of_two))
+    return pages
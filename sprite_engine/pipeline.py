@@ -0,0 +1,160 @@
+import os
+from functools import partial
+
+from .cache import open_manifest, options_digest
+from .encode import write_bytes
+from .executor import TaskQueue, default_workers, make_executor
+from .extract import find_sheets, frame_bytes, load_rgba, render_frame
+from .pack import PackOptions, atlas_formats, crop_to, pack_frames
+from .rawcache import rgba_bytes, sheet_size
+from .report import Reporter, StageStats
+from .resize import QUALITY_GAPS, calculate_factor, resample
+
+
+def group_sheets(tasks):
+    # Pages that extract into the same frame folder are packed together, as
+    # they would be in a separate extract, resize and pack run
+    groups = {}
+    for task in tasks:
+        groups.setdefault((task.relative_path, task.frame_dir_name), []).append(task)
+    return groups
+
+
+def convert_sheets(input_path, output_path, jobs=None, reporter=None, options=None, backend='threads',
+                   cache=True, quality='balanced', resize=True, memory_budget=None):
+    # Extract, resize and pack in one pass. Frames stay in memory between the
+    # stages and the scale comes from the sheet size instead of WxH.txt, so
+    # only the final sheets, atlases and scale files are written.
+    reporter = reporter or Reporter()
+    options = options or PackOptions()
+    atlas_formats(options.formats, options.allow_rotation)
+    if quality not in QUALITY_GAPS:
+        raise ValueError(f"Unknown resize quality: {quality}")
+    stats = StageStats()
+    tasks = find_sheets(input_path, reporter, stats)
+    reporter.stages(stats)
+
+    if not tasks:
+        reporter.status("No valid sprite sheets found")
+        reporter.finish()
+        return 0
+
+    groups = group_sheets(tasks)
+    total_frames = sum(len(task.frames) for task in tasks)
+    reporter.start(total_frames)
+
+    manifest = open_manifest(output_path, cache)
+    options_key = options_digest('convert', {'pack': vars(options), 'quality': quality, 'resize': resize})
+    pending = {}
+    skipped = 0
+
+    def on_result(result):
+        group, outputs, messages, errors, worker_stats = result
+        reporter.stages(worker_stats)
+        for message in messages + errors:
+            reporter.status(message)
+        key, inputs, frame_count = pending.pop(group)
+        if not errors:
+            manifest.record(key, inputs, options_key, outputs)
+        reporter.advance(frame_count)
+
+    # Worker processes cannot call back into the reporter, so they only stop between groups
+    checkpoint = reporter.checkpoint if backend != 'processes' else None
+    workers = default_workers(backend, jobs)
+    try:
+        with make_executor(backend, jobs) as executor, \
+                TaskQueue(executor, workers * 2, on_result, memory_budget) as queue:
+            for group, group_tasks in groups.items():
+                reporter.checkpoint()
+                relative_path, name = group
+                key = f"convert:{os.path.join(relative_path, name)}"
+                sources = [path for task in group_tasks for path in (task.png_path, task.atlas_path)]
+                inputs = manifest.inputs_digest(set(sources), input_path)
+                frame_count = sum(len(task.frames) for task in group_tasks)
+                if manifest.is_fresh(key, inputs, options_key):
+                    skipped += 1
+                    reporter.advance(frame_count)
+                    continue
+                pending[group] = (key, inputs, frame_count)
+                output_dir = os.path.join(output_path, relative_path)
+                queue.submit(convert_group, group, group_tasks, output_dir, options, quality, resize,
+                             checkpoint, cost=group_bytes(group_tasks))
+    finally:
+        manifest.save()
+
+    if skipped:
+        reporter.status(f"Skipped {skipped} unchanged sheets")
+    reporter.status(f"Converted {len(groups)} sprite sheets")
+    reporter.finish()
+    return len(groups)
+
+
+def group_bytes(tasks):
+    # A group holds its decoded sheet and every rendered frame at once
+    total = 0
+    for task in tasks:
+        try:
+            total += rgba_bytes(*sheet_size(task.png_path))
+        except Exception:
+            pass
+        total += sum(frame_bytes(frame) for frame in task.frames)
+    return total
+
+
+def convert_group(group, tasks, output_dir, options, quality='balanced', resize=True, checkpoint=None):
+    # Returns its results instead of reporting them, so it can run in a worker process
+    stats = StageStats()
+    name = group[1]
+    errors = []
+    images = {}
+    factor = 1.0
+
+    # The page that would have written the WxH.txt marker decides the scale
+    for task in sorted(tasks, key=lambda task: not task.write_marker):
+        try:
+            with stats.time('decode', items=1, nbytes=os.path.getsize(task.png_path)):
+                sheet = load_rgba(task.png_path)
+        except Exception as e:
+            errors.append(f"Error processing {task.png_path}: {str(e)}")
+            continue
+        if resize and task.write_marker:
+            factor = calculate_factor(sheet.size)
+
+        for frame in task.frames:
+            if checkpoint is not None:
+                checkpoint()
+            try:
+                with stats.time('crop', items=1):
+                    image = render_frame(sheet, frame, task.clockwise)
+                if factor != 1.0:
+                    new_size = (int(image.width * factor), int(image.height * factor))
+                    with stats.time('resize', items=1):
+                        image = resample(image, new_size, quality)
+            except Exception as e:
+                errors.append(f"Error in {frame.name}: {str(e)}")
+                continue
+            # Keyed by the file name the frame would have had on disk, so
+            # ordering and names match the three-step run
+            images[f"{frame.name}.png"] = image
+
+    if not images:
+        return group, [], [], errors, stats
+
+    os.makedirs(output_dir, exist_ok=True)
+    load = partial(load_memory_frame, images)
+    try:
+        outputs, messages = pack_frames(name, sorted(images), load, output_dir, options, stats, checkpoint)
+    except Exception as e:
+        errors.append(f"Error packing {os.path.join(output_dir, name)}: {str(e)}")
+        return group, [], [], errors, stats
+
+    if factor != 1.0:
+        txt_path = os.path.join(output_dir, f"{name}.txt")
+        write_bytes(f"{round(1 / factor, 2)}".encode('utf-8'), txt_path, stats)
+        outputs.append(txt_path)
+
+    return group, outputs, messages, errors, stats
+
+
+def load_memory_frame(images, file_name, bbox=None):
+    return crop_to(images[file_name], bbox)
@@ -0,0 +1,164 @@
+import hashlib
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+from PIL import Image
+
+from .report import StageStats
+
+# Sheets with at least this many pixels (64MB as RGBA) are decoded once into
+# a raw RGBA file and cut from a read-only memory map
+LARGE_SHEET_PIXELS = 4096 * 4096
+RAW_MAGIC = b'SPRW'
+RAW_HEADER = struct.Struct('<4sII')
+STRIP_ROWS = 256
+RAW_DIR_NAME = '.sprite_raw'
+
+# Maps opened by worker tasks, reused while a process works through one sheet
+OPEN_SHEETS = OrderedDict()
+OPEN_SHEETS_LIMIT = 2
+
+
+def sheet_size(path):
+    # Reads the header only; nothing is decoded
+    with Image.open(path) as image:
+        return image.size
+
+
+def rgba_bytes(width, height):
+    return width * height * 4
+
+
+class RawSheet:
+    # A raw RGBA file mapped read-only. The image shares the mapping, so the
+    # OS page cache holds the pixels once for every process that maps it and
+    # crops copy only the frame.
+    __slots__ = ('path', 'map', 'image')
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, width, height = RAW_HEADER.unpack_from(self.map)
+        if magic != RAW_MAGIC or len(self.map) != RAW_HEADER.size + rgba_bytes(width, height):
+            self.map.close()
+            raise ValueError(f"{path} is not a raw sheet")
+        self.image = Image.frombuffer(
+            'RGBA', (width, height), memoryview(self.map)[RAW_HEADER.size:], 'raw', 'RGBA', 0, 1,
+        )
+
+    def close(self):
+        self.image = None
+        try:
+            self.map.close()
+        except BufferError:
+            # A crop in progress still references it; it closes once collected
+            pass
+
+
+def open_raw_sheet(raw_path):
+    sheet = OPEN_SHEETS.pop(raw_path, None) or RawSheet(raw_path)
+    OPEN_SHEETS[raw_path] = sheet
+    while len(OPEN_SHEETS) > OPEN_SHEETS_LIMIT:
+        OPEN_SHEETS.popitem(last=False)[1].close()
+    return sheet.image
+
+
+def close_raw_sheets():
+    while OPEN_SHEETS:
+        OPEN_SHEETS.popitem()[1].close()
+
+
+def is_raw_sheet(path):
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(RAW_HEADER.size)
+        magic, width, height = RAW_HEADER.unpack(header)
+    except (OSError, struct.error):
+        return False
+    return magic == RAW_MAGIC and os.path.getsize(path) == RAW_HEADER.size + rgba_bytes(width, height)
+
+
+def write_raw_sheet(png_path, raw_path, stats=None, checkpoint=None):
+    # The sheet is decoded once and written out in row strips, so apart from
+    # the decoded sheet only one strip is held at a time
+    stats = stats or StageStats()
+    tmp_path = raw_path + '.part'
+    with Image.open(png_path) as image:
+        with stats.time('decode', items=1, nbytes=os.path.getsize(png_path)):
+            image.load()
+        width, height = image.size
+        try:
+            with stats.time('write', items=1, nbytes=RAW_HEADER.size + rgba_bytes(width, height)):
+                with open(tmp_path, 'wb') as f:
+                    f.write(RAW_HEADER.pack(RAW_MAGIC, width, height))
+                    for top in range(0, height, STRIP_ROWS):
+                        if checkpoint is not None:
+                            checkpoint()
+                        strip = image.crop((0, top, width, min(height, top + STRIP_ROWS)))
+                        if strip.mode != 'RGBA':
+                            strip = strip.convert('RGBA')
+                        f.write(strip.tobytes())
+            os.replace(tmp_path, raw_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class RawSheetCache:
+    # Raw RGBA copies of large sheets under cache_dir, keyed by path, size and
+    # mtime so an unchanged sheet written by an earlier run that was
+    # interrupted is reused. Files created by this run are removed by
+    # cleanup(). cache_dir should be on disk: the system temp folder is often
+    # tmpfs, where the "mapped file" would be one more copy of the sheet in RAM.
+
+    def __init__(self, cache_dir, threshold=LARGE_SHEET_PIXELS):
+        self.cache_dir = cache_dir
+        self.threshold = threshold
+        self.created = []
+        self.created_dir = False
+
+    def is_large(self, size):
+        return bool(self.threshold) and size[0] * size[1] >= self.threshold
+
+    def raw_path(self, png_path):
+        stat = os.stat(png_path)
+        key = f"{os.path.abspath(png_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        name = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.rgba")
+
+    def prepare(self, png_path, stats=None, checkpoint=None):
+        raw_path = self.raw_path(png_path)
+        if not is_raw_sheet(raw_path):
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+                self.created_dir = True
+            write_raw_sheet(png_path, raw_path, stats, checkpoint)
+        if raw_path not in self.created:
+            self.created.append(raw_path)
+        return raw_path
+
+    def cleanup(self):
+        close_raw_sheets()
+        for raw_path in self.created:
+            try:
+                os.remove(raw_path)
+            except OSError:
+                # Still mapped somewhere (Windows); the next run reuses or replaces it
+                pass
+        self.created = []
+        if self.created_dir:
+            try:
+                os.rmdir(self.cache_dir)
+            except OSError:
+                pass
+            self.created_dir = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
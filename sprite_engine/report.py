@@ -0,0 +1,161 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageStats:
+    # Wall time, item count and byte count per pipeline stage (scan, parse,
+    # decode, crop, trim, resize, pack, blit, quantize, encode, write). Workers fill one
+    # in and return it with their result so it survives process pools.
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, stage, seconds=0.0, items=0, nbytes=0):
+        total = self.totals.setdefault(stage, [0.0, 0, 0])
+        total[0] += seconds
+        total[1] += items
+        total[2] += nbytes
+
+    @contextmanager
+    def time(self, stage, items=0, nbytes=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, items, nbytes)
+
+    def merge(self, other):
+        for stage, (seconds, items, nbytes) in other.totals.items():
+            self.add(stage, seconds, items, nbytes)
+
+    def as_dict(self):
+        return {
+            stage: {'seconds': round(seconds, 6), 'items': items, 'bytes': nbytes}
+            for stage, (seconds, items, nbytes) in self.totals.items()
+        }
+
+
+class Reporter:
+    # Receives progress from the engine; the default one discards everything
+
+    def start(self, total):
+        pass
+
+    def advance(self, value=1):
+        pass
+
+    def status(self, message):
+        pass
+
+    def stages(self, stats):
+        pass
+
+    def checkpoint(self):
+        # Called between units of work (atlases, sheets, folders, frames); a
+        # reporter may block here to pause the run or raise to stop it
+        pass
+
+    def finish(self):
+        pass
+
+
+class EventReporter(Reporter):
+    # Turns engine callbacks into structured event dicts for any number of sinks
+    # (the UI, a JSON-lines log, a plain callback). Progress is coalesced and
+    # emitted at most once per `interval` seconds so per-frame updates don't
+    # flood the receiver; status messages and the final summary flush it first.
+
+    def __init__(self, sinks=(), job=None, interval=0.1):
+        self.sinks = list(sinks)
+        self.job = job
+        self.interval = interval
+        self.stats = StageStats()
+        self.total = 0
+        self.done = 0
+        self.reported = 0
+        self.started_at = time.perf_counter()
+        self.last_flush = 0.0
+        self.lock = threading.Lock()
+
+    def emit(self, event_type, **data):
+        event = {'type': event_type, 'job': self.job, 'time': time.time()}
+        event.update(data)
+        for sink in self.sinks:
+            sink(event)
+
+    def start(self, total):
+        with self.lock:
+            self.total = total
+            self.done = 0
+            self.reported = 0
+            self.started_at = time.perf_counter()
+        self.emit('start', total=total)
+
+    def advance(self, value=1):
+        with self.lock:
+            self.done += value
+            now = time.perf_counter()
+            if now - self.last_flush < self.interval and self.done < self.total:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.done == self.reported:
+                return
+            done, total = self.done, self.total
+            self.reported = done
+            self.last_flush = time.perf_counter()
+        self.emit('progress', done=done, total=total)
+
+    def status(self, message):
+        self.flush()
+        self.emit('status', message=message)
+
+    def stages(self, stats):
+        with self.lock:
+            self.stats.merge(stats)
+
+    def finish(self):
+        self.flush()
+        with self.lock:
+            elapsed = time.perf_counter() - self.started_at
+            stages = self.stats.as_dict()
+        self.emit('summary', done=self.done, total=self.total, seconds=round(elapsed, 6), stages=stages)
+
+
+class JsonLinesSink:
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+class ConsoleSink:
+    # Prints status messages and a per-stage timing table at the end
+
+    def __init__(self, stream=None, quiet=False):
+        self.stream = stream or sys.stderr
+        self.quiet = quiet
+
+    def __call__(self, event):
+        if self.quiet:
+            return
+        if event['type'] == 'status':
+            print(event['message'], file=self.stream)
+        elif event['type'] == 'summary' and event['stages']:
+            print(f"Finished in {event['seconds']:.2f}s", file=self.stream)
+            for stage, totals in sorted(event['stages'].items(), key=lambda item: -item[1]['seconds']):
+                print(
+                    f"  {stage:<8} {totals['seconds']:9.3f}s  {totals['items']:>8} items  "
+                    f"{totals['bytes'] / (1024 * 1024):9.1f} MB",
+                    file=self.stream,
+                )
@@ -0,0 +1,241 @@
+import os
+import re
+
+from PIL import Image
+
+from .cache import open_manifest, options_digest
+from .executor import TaskQueue, chunk_size, chunked, default_workers, make_executor
+from .encode import frame_profile, write_image
+from .report import Reporter, StageStats
+
+
+DIMENSIONS_PATTERN = re.compile(r'(\d+)x(\d+)')
+
+
+class FolderScan:
+    __slots__ = ('path', 'images', 'texts')
+
+    def __init__(self, path, images, texts):
+        self.path = path
+        self.images = images
+        self.texts = texts
+
+
+def scan_tree(input_path, exclude=None):
+    # One os.scandir pass over the tree; only names are kept, and the output
+    # folder is skipped when it lives inside the input
+    exclude = os.path.realpath(exclude) if exclude else None
+    folders = []
+    stack = [input_path]
+    while stack:
+        folder = stack.pop()
+        images, texts, subdirs = [], [], []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if exclude is None or os.path.realpath(entry.path) != exclude:
+                        subdirs.append(entry.path)
+                elif entry.name.endswith('.png'):
+                    images.append(entry.name)
+                elif entry.name.lower().endswith('.txt'):
+                    texts.append(entry.name)
+        if images:
+            folders.append(FolderScan(folder, sorted(images), texts))
+        stack.extend(sorted(subdirs, reverse=True))
+    return folders
+
+
+def resize_frames(input_path, output_path, jobs=None, reporter=None, backend='threads', cache=True,
+                  keep_originals=True, quality='balanced', encode='balanced'):
+    reporter = reporter or Reporter()
+    frame_profile(encode)
+    stats = StageStats()
+    with stats.time('scan'):
+        folders = scan_tree(input_path, exclude=output_path)
+    reporter.stages(stats)
+    total_files = sum(len(folder.images) for folder in folders)
+
+    if total_files == 0:
+        reporter.status("No PNG files found")
+        reporter.finish()
+        return 0
+
+    reporter.start(total_files)
+
+    manifest = open_manifest(output_path, cache)
+    pending = {}
+    skipped = 0
+
+    def finish(input_file, failed):
+        build = pending[os.path.dirname(input_file)]
+        build['remaining'] -= 1
+        build['failed'] = build['failed'] or failed
+        if build['remaining'] == 0 and not build['failed']:
+            manifest.record(build['key'], build['inputs'], build['options'], build['outputs'])
+
+    def on_result(result):
+        resized, errors, worker_stats = result
+        reporter.stages(worker_stats)
+        reporter.advance(len(resized))
+        for input_file in resized:
+            finish(input_file, False)
+        for input_file, error in errors:
+            reporter.status(error)
+            finish(input_file, True)
+
+    workers = default_workers(backend, jobs)
+    try:
+        with make_executor(backend, jobs) as executor, TaskQueue(executor, workers * 2, on_result) as queue:
+            for folder in folders:
+                reporter.checkpoint()
+                items, outputs, factor = plan_folder(folder, input_path, output_path, keep_originals, quality, encode)
+                key = f"resize:{os.path.relpath(folder.path, input_path)}"
+                sources = [os.path.join(folder.path, name) for name in folder.images + folder.texts]
+                inputs = manifest.inputs_digest(sources, input_path)
+                options = options_digest('resize', {'factor': factor, 'quality': quality, 'encode': encode})
+                if manifest.is_fresh(key, inputs, options):
+                    skipped += 1
+                    reporter.advance(len(items))
+                    continue
+                pending[folder.path] = {
+                    'key': key,
+                    'inputs': inputs,
+                    'options': options,
+                    'outputs': outputs,
+                    'remaining': len(items),
+                    'failed': False,
+                }
+                write_scale(folder, input_path, output_path, factor)
+                for chunk in chunked(items, chunk_size(len(items), workers, backend)):
+                    queue.submit(resize_chunk, chunk)
+    finally:
+        manifest.save()
+
+    if skipped:
+        reporter.status(f"Skipped {skipped} unchanged folders")
+    reporter.status(f"Resized {total_files} images")
+    reporter.finish()
+    return total_files
+
+
+def export_paths(folder, input_path, output_path):
+    export_path = os.path.join(output_path, os.path.relpath(folder.path, input_path))
+    return export_path, os.path.join(export_path, f"{os.path.basename(folder.path)}.txt")
+
+
+def plan_folder(folder, input_path, output_path, keep_originals=True, quality='balanced', encode='balanced'):
+    # Touches nothing on disk, so cached folders are skipped without writes
+    export_path, txt_path = export_paths(folder, input_path, output_path)
+
+    dim = get_dimensions_from_txt(folder.path, folder.texts)
+    factor = calculate_factor(dim)
+
+    outputs = [os.path.join(export_path, img_file) for img_file in folder.images]
+    if factor != 1.0:
+        outputs.append(txt_path)
+
+    items = [
+        (os.path.join(folder.path, img_file), os.path.join(export_path, img_file), factor, keep_originals, quality,
+         encode)
+        for img_file in folder.images
+    ]
+    return items, outputs, factor
+
+
+def write_scale(folder, input_path, output_path, factor):
+    export_path, txt_path = export_paths(folder, input_path, output_path)
+    os.makedirs(export_path, exist_ok=True)
+    if factor != 1.0:
+        with open(txt_path, "w") as f:
+            f.write(f"{round(1 / factor, 2)}")
+
+
+def resize_chunk(items):
+    stats = StageStats()
+    resized = []
+    errors = []
+    for input_file, output_file, factor, keep_original, quality, encode in items:
+        try:
+            resize_image(input_file, output_file, factor, keep_original, quality, stats, encode)
+            resized.append(input_file)
+        except Exception as e:
+            errors.append((input_file, f"Error in {os.path.basename(input_file)}: {str(e)}"))
+    return resized, errors, stats
+
+
+def get_dimensions_from_txt(folder_path, txt_files=None):
+    if txt_files is None:
+        txt_files = [f for f in os.listdir(folder_path) if f.lower().endswith('.txt')]
+    for txt_file in txt_files:
+        with open(os.path.join(folder_path, txt_file), 'r') as f:
+            content = f.read().strip()
+            matches = DIMENSIONS_PATTERN.findall(content)
+            if matches:
+                return tuple(map(int, matches[0]))
+    return None
+
+
+# (minimum average side of the source sheet, scale factor), largest first
+FACTOR_TABLE = (
+    (8192, 0.25),
+    (4096, 0.4),
+    (2048, 0.5),
+)
+
+# The image is first shrunk with reduce() (a box average) by the largest whole
+# factor that keeps it at least this many times the target size, and only that
+# last step goes through LANCZOS. None resamples the full-size image.
+QUALITY_GAPS = {
+    'fast': 1.0,
+    'balanced': 2.0,
+    'exact': None,
+}
+
+# Modes reduce() handles; palette, bilevel and 16-bit frames skip it and go
+# straight to resize() as they did before reduce() was used
+REDUCE_MODES = {'L', 'LA', 'La', 'RGB', 'RGBA', 'RGBa', 'RGBX', 'CMYK', 'YCbCr', 'I', 'F'}
+
+
+def calculate_factor(dim):
+    if not dim:
+        return 1.0
+    width, height = dim
+    average = (width + height) / 2
+    for minimum, factor in FACTOR_TABLE:
+        if average >= minimum:
+            return factor
+    return 1.0
+
+
+def resample(img, new_size, quality='balanced'):
+    if quality not in QUALITY_GAPS:
+        raise ValueError(f"Unknown resize quality: {quality}")
+    if new_size == img.size:
+        return img.copy()
+
+    gap = QUALITY_GAPS[quality]
+    if gap is not None and img.mode in REDUCE_MODES and new_size[0] and new_size[1]:
+        reduce_by = int(min(img.width / new_size[0], img.height / new_size[1]) / gap)
+        if reduce_by > 1:
+            img = img.reduce(reduce_by)
+            if img.size == new_size:
+                return img
+
+    return img.resize(new_size, Image.Resampling.LANCZOS)
+
+
+def resize_image(image_path, output_path, factor, keep_original=True, quality='balanced', stats=None,
+                 encode='balanced'):
+    stats = stats or StageStats()
+    with Image.open(image_path) as img:
+        with stats.time('decode', items=1, nbytes=os.path.getsize(image_path)):
+            img.load()
+        new_size = (int(img.width * factor), int(img.height * factor))
+        with stats.time('resize', items=1):
+            resized = resample(img, new_size, quality)
+
+    # Written atomically so the source is only removed once its replacement exists
+    write_image(resized, output_path, stats, atomic=True, profile=encode)
+
+    if not keep_original and os.path.abspath(image_path) != os.path.abspath(output_path):
+        os.remove(image_path)
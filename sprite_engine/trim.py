@@ -0,0 +1,68 @@
+from PIL import Image
+
+from .report import StageStats
+
+
+class TrimmedFrame:
+    __slots__ = ('name', 'image', 'source_size', 'bbox')
+
+    def __init__(self, name, image, source_size, bbox):
+        self.name = name
+        self.image = image
+        self.source_size = source_size
+        self.bbox = bbox
+
+
+def alpha_bbox(image, threshold=0):
+    # Bounding box of pixels with alpha above threshold, straight from the
+    # alpha channel; None when the frame is fully transparent
+    if 'A' not in image.getbands():
+        return (0, 0, image.width, image.height)
+    alpha = image.getchannel('A')
+    if threshold:
+        alpha = alpha.point(lambda a: 255 if a > threshold else 0)
+    return alpha.getbbox()
+
+
+def trim_image(image, threshold=0, margin=0):
+    bbox = alpha_bbox(image, threshold)
+    if bbox is None:
+        # Keep a single transparent pixel so the frame still gets a region
+        bbox = (0, 0, 1, 1)
+    elif margin:
+        bbox = (
+            max(0, bbox[0] - margin),
+            max(0, bbox[1] - margin),
+            min(image.width, bbox[2] + margin),
+            min(image.height, bbox[3] + margin),
+        )
+    if bbox == (0, 0, image.width, image.height):
+        return image, bbox
+    return image.crop(bbox), bbox
+
+
+def trim_frames(names, threshold=0, margin=0, loader=None, stats=None):
+    # Yields a TrimmedFrame per name, loading one frame at a time
+    stats = stats or StageStats()
+    for file_name in names:
+        image = loader(file_name)
+        with stats.time('trim', items=1):
+            trimmed, bbox = trim_image(image, threshold, margin)
+        yield TrimmedFrame(file_name, trimmed, image.size, bbox)
+
+
+def extrude_image(image, amount):
+    # Repeats the outermost pixels `amount` times on every side so texture
+    # filtering at the region edge never samples a neighbouring frame
+    if amount <= 0:
+        return image
+    width, height = image.size
+    extruded = Image.new(image.mode, (width + 2 * amount, height + 2 * amount))
+    extruded.paste(image, (amount, amount))
+    extruded.paste(image.crop((0, 0, 1, height)).resize((amount, height), Image.NEAREST), (0, amount))
+    extruded.paste(image.crop((width - 1, 0, width, height)).resize((amount, height), Image.NEAREST), (width + amount, amount))
+    top = extruded.crop((0, amount, width + 2 * amount, amount + 1))
+    bottom = extruded.crop((0, height + amount - 1, width + 2 * amount, height + amount))
+    extruded.paste(top.resize((width + 2 * amount, amount), Image.NEAREST), (0, 0))
+    extruded.paste(bottom.resize((width + 2 * amount, amount), Image.NEAREST), (0, height + amount))
+    return extruded
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+from sprite_engine import PackOptions, create_sprites, extract_frames, resize_frames
+
+from .test_roundtrip import make_frames
+
+
+def listing(folder):
+    return sorted(name for name in os.listdir(folder) if not name.startswith('.'))
+
+
+def test_unchanged_sheets_are_skipped(tmp_path):
+    make_frames(str(tmp_path / 'frames' / 'hero'))
+    create_sprites(str(tmp_path / 'frames'), str(tmp_path / 'packed'), backend='serial')
+    extract_frames(str(tmp_path / 'packed'), str(tmp_path / 'extracted'), backend='serial')
+    frame = tmp_path / 'extracted' / 'hero' / 'frame00.png'
+    mtime = os.stat(frame).st_mtime_ns
+
+    extract_frames(str(tmp_path / 'packed'), str(tmp_path / 'extracted'), backend='serial')
+    assert os.stat(frame).st_mtime_ns == mtime
+
+
+def test_regrouped_pages_are_extracted_again(tmp_path):
+    # Pages hero-0 and hero-1 extract into hero/ until a sheet called hero
+    # appears next to them; then each page needs its own folder
+    make_frames(str(tmp_path / 'frames' / 'hero'))
+    make_frames(str(tmp_path / 'other' / 'hero'), count=4, seed=1)
+    create_sprites(str(tmp_path / 'frames'), str(tmp_path / 'packed'), backend='serial',
+                   options=PackOptions(max_size=64))
+    create_sprites(str(tmp_path / 'other'), str(tmp_path / 'other_packed'), backend='serial')
+    extract_frames(str(tmp_path / 'packed'), str(tmp_path / 'extracted'), backend='serial')
+    assert listing(tmp_path / 'extracted') == ['hero']
+
+    for file in ('hero.png', 'hero.xml'):
+        shutil.copy(tmp_path / 'other_packed' / file, tmp_path / 'packed' / file)
+    extract_frames(str(tmp_path / 'packed'), str(tmp_path / 'extracted'), backend='serial')
+    assert listing(tmp_path / 'extracted') == ['hero', 'hero-0', 'hero-1']
+    pages = os.listdir(tmp_path / 'extracted' / 'hero-0') + os.listdir(tmp_path / 'extracted' / 'hero-1')
+    assert 'frame00.png' in pages
+
+
+def test_unchanged_folders_are_not_resized_or_rewritten(tmp_path):
+    make_frames(str(tmp_path / 'frames' / 'hero'), count=4)
+    (tmp_path / 'frames' / 'hero' / 'hero.txt').write_text('4096x4096')
+    resize_frames(str(tmp_path / 'frames'), str(tmp_path / 'resized'), backend='serial')
+    scale = tmp_path / 'resized' / 'hero' / 'hero.txt'
+    assert scale.read_text() == '2.5'
+    mtimes = {file: os.stat(tmp_path / 'resized' / 'hero' / file).st_mtime_ns
+              for file in listing(tmp_path / 'resized' / 'hero')}
+
+    resize_frames(str(tmp_path / 'frames'), str(tmp_path / 'resized'), backend='serial')
+    assert mtimes == {file: os.stat(tmp_path / 'resized' / 'hero' / file).st_mtime_ns
+                      for file in listing(tmp_path / 'resized' / 'hero')}
+
+
+def test_cached_pack_run_creates_no_sheets(tmp_path):
+    make_frames(str(tmp_path / 'frames' / 'hero'), count=4)
+    make_frames(str(tmp_path / 'frames' / 'villain'), count=4, seed=1)
+    assert create_sprites(str(tmp_path / 'frames'), str(tmp_path / 'packed'), backend='serial') == 2
+    assert create_sprites(str(tmp_path / 'frames'), str(tmp_path / 'packed'), backend='serial') == 0
@@ -0,0 +1,36 @@
+import os
+import shutil
+
+import pytest
+from PIL import Image
+
+from sprite_engine import PackOptions, create_sprites, extract_frames
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'libgdx')
+
+
+# pack.atlas is the layout libGDX's TexturePacker writes (legacy 3.x fields),
+# pack4.atlas the same regions in the 4.x bounds/offsets form. Rotated regions
+# are stored counter-clockwise; expected/ holds the frames before packing.
+@pytest.mark.parametrize('atlas', ['pack.atlas', 'pack4.atlas'])
+def test_libgdx_atlas_extracts_upright_frames(tmp_path, atlas):
+    source = tmp_path / 'sheets'
+    source.mkdir()
+    shutil.copy(os.path.join(FIXTURES, 'pack.png'), source / 'pack.png')
+    shutil.copy(os.path.join(FIXTURES, atlas), source / atlas)
+    extract_frames(str(source), str(tmp_path / 'out'), backend='serial', cache=False)
+
+    folder = tmp_path / 'out' / os.path.splitext(atlas)[0]
+    for name in ('arrow', 'block'):
+        with Image.open(folder / f"{name}.png") as image, \
+                Image.open(os.path.join(FIXTURES, 'expected', f"{name}.png")) as expected:
+            assert image.size == expected.size, name
+            assert image.convert('RGBA').tobytes() == expected.convert('RGBA').tobytes(), name
+
+
+def test_rotation_is_rejected_for_spine(tmp_path):
+    (tmp_path / 'frames' / 'hero').mkdir(parents=True)
+    Image.new('RGBA', (4, 8), (255, 0, 0, 255)).save(tmp_path / 'frames' / 'hero' / 'a.png')
+    options = PackOptions(formats=('sparrow', 'spine'), allow_rotation=True)
+    with pytest.raises(ValueError):
+        create_sprites(str(tmp_path / 'frames'), str(tmp_path / 'packed'), options=options, backend='serial')
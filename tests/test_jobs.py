@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+import pytest
+
+from sprite_engine import (FINISHED_STATES, Job, JobCancelled, JobReporter, JobScheduler, create_sprites,
+                           extract_frames)
+
+from .test_roundtrip import make_frames
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def wait_finished(job):
+    wait_until(lambda: job.state in FINISHED_STATES)
+
+
+def counting(count, progress, started, reporter=None):
+    reporter.start(count)
+    for i in range(count):
+        reporter.advance(1)
+        progress.append(i)
+        started.set()
+        time.sleep(0.005)
+    return count
+
+
+def packed_sheets(tmp_path):
+    make_frames(str(tmp_path / 'frames' / 'hero'))
+    create_sprites(str(tmp_path / 'frames'), str(tmp_path / 'packed'), backend='serial', cache=False)
+    return str(tmp_path / 'packed')
+
+
+def written_files(folder):
+    return [file for _, _, files in os.walk(folder) for file in files]
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = JobScheduler(interval=0)
+    yield scheduler
+    scheduler.shutdown(wait=True, timeout=10)
+
+
+def test_pause_holds_a_running_job_until_resumed(scheduler):
+    progress, started = [], threading.Event()
+    job = scheduler.submit('count', counting, 200, progress, started)
+    assert started.wait(10)
+
+    scheduler.pause()
+    time.sleep(0.1)
+    held = len(progress)
+    time.sleep(0.1)
+    assert len(progress) == held < 200
+    assert job.state == 'running'
+
+    scheduler.resume()
+    wait_finished(job)
+    assert job.state == 'done'
+    assert job.result == len(progress) == 200
+
+
+def test_cancel_stops_a_running_job(scheduler):
+    progress, started = [], threading.Event()
+    job = scheduler.submit('count', counting, 1000, progress, started)
+    assert started.wait(10)
+    scheduler.cancel(job)
+    wait_finished(job)
+    assert job.state == 'cancelled'
+    assert len(progress) < 1000
+
+
+def test_cancelled_extract_writes_no_frames(tmp_path):
+    # Cancelling as soon as the run starts stops it at the first sheet
+    input_path = packed_sheets(tmp_path)
+    output_path = str(tmp_path / 'extracted')
+    jobs = []
+
+    def cancel_on_start(event):
+        if event['type'] == 'start':
+            jobs[0].cancel()
+
+    scheduler = JobScheduler(sinks=[cancel_on_start], interval=0)
+    try:
+        # Held until the sink can see the job
+        scheduler.pause()
+        jobs.append(scheduler.submit('extract', extract_frames, input_path, output_path, backend='threads'))
+        scheduler.resume()
+        wait_finished(jobs[0])
+    finally:
+        scheduler.shutdown(wait=True, timeout=10)
+    assert jobs[0].state == 'cancelled'
+    assert not os.path.exists(output_path) or written_files(output_path) == []
+
+
+def test_cancelled_job_stops_the_sheet_scan(tmp_path):
+    input_path = packed_sheets(tmp_path)
+    job = Job('extract', extract_frames)
+    job.cancel()
+    with pytest.raises(JobCancelled):
+        extract_frames(input_path, str(tmp_path / 'extracted'), reporter=JobReporter(job), backend='serial')
+    assert not os.path.exists(tmp_path / 'extracted')
+
+
+def test_queued_job_with_the_same_key_is_rejected(scheduler):
+    scheduler.pause()
+    first = scheduler.submit('count', counting, 1, [], threading.Event(), key='hero')
+    assert scheduler.submit('count', counting, 1, [], threading.Event(), key='hero') is None
+    other = scheduler.submit('count', counting, 1, [], threading.Event(), key='villain')
+    assert other is not None
+    scheduler.resume()
+    wait_finished(other)
+    assert first.state == other.state == 'done'
+
+    # Once finished, the key can be queued again
+    again = scheduler.submit('count', counting, 1, [], threading.Event(), key='hero')
+    wait_finished(again)
+    assert again.state == 'done'
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from sprite_engine.packer import ALGORITHMS, pack_pages, pack_rects, try_pack
+
+
+def random_items(count, seed, max_side=120):
+    rng = random.Random(seed)
+    return [(f"item{i}", rng.randint(1, max_side), rng.randint(1, max_side)) for i in range(count)]
+
+
+def check_layout(layout, items, padding):
+    sizes = {key: (width, height) for key, width, height in items}
+    placements = list(layout.placements.values())
+    for placement in placements:
+        width, height = sizes[placement.key]
+        if placement.rotated:
+            width, height = height, width
+        assert (placement.width, placement.height) == (width, height)
+        assert placement.x >= 0 and placement.y >= 0
+        assert placement.x + placement.width <= layout.width
+        assert placement.y + placement.height <= layout.height
+
+    # Each item owns its padding on the right and bottom, so padded rects never overlap
+    for i, a in enumerate(placements):
+        for b in placements[i + 1:]:
+            assert (a.x + a.width + padding <= b.x or b.x + b.width + padding <= a.x
+                    or a.y + a.height + padding <= b.y or b.y + b.height + padding <= a.y), (a.key, b.key)
+
+
+@pytest.mark.parametrize('algorithm', sorted(ALGORITHMS))
+@pytest.mark.parametrize('allow_rotation', [False, True])
+@pytest.mark.parametrize('padding', [0, 2])
+def test_pack_rects_in_bounds_without_overlap(algorithm, allow_rotation, padding):
+    items = random_items(150, seed=1)
+    layout = pack_rects(items, algorithm, padding=padding, allow_rotation=allow_rotation)
+    assert sorted(layout.placements) == sorted(key for key, _, _ in items)
+    check_layout(layout, items, padding)
+
+
+@pytest.mark.parametrize('algorithm', sorted(ALGORITHMS))
+@pytest.mark.parametrize('allow_rotation', [False, True])
+@pytest.mark.parametrize('power_of_two', [False, True])
+def test_pack_pages_spill_within_max_size(algorithm, allow_rotation, power_of_two):
+    items = random_items(150, seed=2)
+    pages = pack_pages(items, algorithm, padding=2, max_size=256, power_of_two=power_of_two,
+                       allow_rotation=allow_rotation)
+    assert len(pages) > 1
+    placed = [key for layout in pages for key in layout.placements]
+    assert sorted(placed) == sorted(key for key, _, _ in items)
+    for layout in pages:
+        assert layout.width <= 256 and layout.height <= 256
+        if power_of_two:
+            assert layout.width & (layout.width - 1) == 0
+            assert layout.height & (layout.height - 1) == 0
+        check_layout(layout, items, 2)
+
+
+@pytest.mark.parametrize('algorithm', sorted(ALGORITHMS))
+def test_rotation_turns_items_that_only_fit_sideways(algorithm):
+    items = [('tall', 10, 150)]
+    assert try_pack(items, 150, 10, algorithm) is None
+    placement = try_pack(items, 150, 10, algorithm, allow_rotation=True)['tall']
+    assert placement.rotated
+    assert (placement.width, placement.height) == (150, 10)
+
+
+def test_item_larger_than_max_size_is_rejected():
+    with pytest.raises(ValueError):
+        pack_rects([('big', 300, 10)], max_size=256)
@@ -0,0 +1,81 @@
+import os
+import random
+
+import pytest
+from PIL import Image
+
+from sprite_engine import FORMATS, PackOptions, create_sprites, extract_frames, get_format
+
+
+def make_frames(folder, count=24, seed=0):
+    # Opaque-ish noise inside a transparent border, so frames trim, some are
+    # tall enough to rotate, and one is a duplicate
+    rng = random.Random(seed)
+    os.makedirs(folder)
+    frames = {}
+    for i in range(count):
+        width, height = rng.randint(8, 48), rng.randint(8, 48)
+        image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        left, top = rng.randint(0, width // 3), rng.randint(0, height // 3)
+        inner = (rng.randint(1, width - left), rng.randint(1, height - top))
+        pixels = bytes(
+            rng.randint(1, 255) if index % 4 == 3 else rng.getrandbits(8)
+            for index in range(inner[0] * inner[1] * 4)
+        )
+        image.paste(Image.frombytes('RGBA', inner, pixels), (left, top))
+        frames[f"frame{i:02d}"] = image
+    frames['frame_copy'] = frames['frame00']
+    for name, image in frames.items():
+        image.save(os.path.join(folder, f"{name}.png"))
+    return frames
+
+
+def pack_and_extract(tmp_path, options):
+    frames = make_frames(str(tmp_path / 'frames' / 'hero'))
+    create_sprites(str(tmp_path / 'frames'), str(tmp_path / 'packed'), options=options, backend='serial',
+                   cache=False)
+    extract_frames(str(tmp_path / 'packed'), str(tmp_path / 'extracted'), backend='serial', cache=False)
+    return frames
+
+
+def assert_frames_equal(frames, folder):
+    extracted = sorted(file[:-4] for file in os.listdir(folder) if file.endswith('.png'))
+    assert extracted == sorted(frames)
+    for name, expected in frames.items():
+        with Image.open(os.path.join(folder, f"{name}.png")) as image:
+            assert image.size == expected.size, name
+            assert image.convert('RGBA').tobytes() == expected.tobytes(), name
+
+
+OPTIONS = {
+    'plain': {},
+    'rotate': {'allow_rotation': True},
+    'extrude': {'extrude': 2},
+    'pages': {'max_size': 64, 'allow_rotation': True, 'extrude': 1},
+}
+
+
+@pytest.mark.parametrize('fmt', sorted(FORMATS))
+@pytest.mark.parametrize('case', sorted(OPTIONS))
+def test_pack_then_extract_returns_the_same_frames(tmp_path, fmt, case):
+    options = dict(OPTIONS[case])
+    if not get_format(fmt).clockwise:
+        # The shared sheet stores rotated frames clockwise, so these formats pack upright
+        options.pop('allow_rotation', None)
+    frames = pack_and_extract(tmp_path, PackOptions(formats=(fmt,), **options))
+    if case == 'pages':
+        assert os.path.exists(tmp_path / 'packed' / 'hero-1.png')
+    # Pages of one packed set come back as one frame folder with one marker
+    assert os.listdir(tmp_path / 'extracted') == ['hero']
+    assert_frames_equal(frames, tmp_path / 'extracted' / 'hero')
+
+
+def test_pages_written_in_every_format_extract_as_one_folder(tmp_path):
+    options = PackOptions(formats=('sparrow', 'json-hash', 'spine'), max_size=64, extrude=1)
+    frames = pack_and_extract(tmp_path, options)
+    assert os.path.exists(tmp_path / 'packed' / 'hero.atlas')
+    assert os.path.exists(tmp_path / 'packed' / 'hero-1.xml')
+    assert os.listdir(tmp_path / 'extracted') == ['hero']
+    folder = tmp_path / 'extracted' / 'hero'
+    assert len([file for file in os.listdir(folder) if file.endswith('.txt')]) == 1
+    assert_frames_equal(frames, folder)